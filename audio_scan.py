@@ -0,0 +1,171 @@
+"""
+audio_scan.py — Offline YAMNet scan of archived recordings
+==========================================================
+
+Runs the same YAMNet cat-sound detection as cat_audio_monitor.py, but over
+the clips already on disk (recordings/, detections/) at batch speed:
+  * audio is extracted from many files in parallel (one ffmpeg per file),
+  * the waveforms are packed back to back, hop-aligned with a silent gap,
+    so one YAMNet call scores many files' windows at once,
+  * per-file event timelines (class, time, score) go into audio_index.json.
+
+Files already in the index (same size and mtime) are skipped; files ffmpeg
+fails to decode are left out of it, so the next run retries them.
+
+Usage: python audio_scan.py [dirs ...]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from cat_audio_monitor import YAMNET_URL, load_class_names
+from model_registry import get_model
+
+# --- CONFIGURATION ---
+SCAN_DIRS = ["recordings", "detections"]
+VIDEO_EXTS = (".mp4", ".mov", ".wav")
+INDEX_FILE = Path("audio_index.json")
+# Same classes/threshold/gain as cat_audio_monitor.py
+# 81=Cat, 82=Meow, 83=Caterwaul, 20=Crying/sobbing, 21=Baby cry
+TARGET_CLASSES = [81, 82, 83, 20, 21]
+CONF_THRESHOLD = 0.25
+GAIN_FACTOR = 3.5
+SAMPLE_RATE = 16000
+HOP = 7680                     # YAMNet frame hop: 0.48 s at 16 kHz
+BATCH_SECONDS = 600            # Audio packed into one model call
+EXTRACT_WORKERS = os.cpu_count() or 4
+
+
+def extract_audio(path: Path) -> Optional[np.ndarray]:
+    """
+    Decode a file's audio track to float32 mono 16 kHz (empty if it has none).
+    Returns None if ffmpeg fails, e.g. on a clip that is still being written.
+    """
+    command = [
+        'ffmpeg', '-v', 'error', '-i', str(path),
+        '-vn', '-acodec', 'pcm_s16le', '-ar', str(SAMPLE_RATE), '-ac', '1', '-f', 's16le', '-'
+    ]
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0:
+        error = result.stderr.decode(errors="replace").strip()
+        if "does not contain any stream" in error:
+            return np.zeros(0, np.float32)   # Video without an audio track
+        print(f"⚠️  ffmpeg failed on {path}: {error.splitlines()[-1] if error else result.returncode}")
+        return None
+    audio = np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+    return np.clip(audio * GAIN_FACTOR, -1.0, 1.0)
+
+
+def pack(batch):
+    """
+    Lay waveforms end to end. Each one starts on a hop boundary and is
+    followed by one hop of silence, so window k of the packed signal maps
+    to exactly one file and no window mixes two files' audio.
+    """
+    pieces, spans, offset = [], [], 0
+    for key, audio in batch:
+        padded = int(np.ceil(len(audio) / HOP)) * HOP
+        pieces += [audio, np.zeros(padded - len(audio) + HOP, np.float32)]
+        spans.append((key, offset // HOP, len(audio)))
+        offset += padded + HOP
+    return np.concatenate(pieces), spans
+
+
+def score_batch(model, class_names, batch):
+    """Returns {key: (duration, [events])} for a list of (key, waveform)."""
+    waveform, spans = pack(batch)
+    scores, _, _ = model(waveform)
+    scores = scores.numpy()
+    timelines = {}
+    for key, first, samples in spans:
+        if samples == 0:
+            # No audio: its span is just the gap, window `first` belongs to the next file
+            timelines[key] = (0.0, [])
+            continue
+        count, events = samples // HOP, []
+        # Windows are 2 hops long, so the last window of a file would run into
+        # the silent gap; keep it only if the file is shorter than one window.
+        for k in range(max(1, count - 1)):
+            if first + k >= len(scores):
+                break
+            frame = scores[first + k]
+            for cls in TARGET_CLASSES:
+                if frame[cls] > CONF_THRESHOLD:
+                    events.append({"class": class_names[cls],
+                                   "time": round(k * HOP / SAMPLE_RATE, 2),
+                                   "score": round(float(frame[cls]), 3)})
+        timelines[key] = (samples / SAMPLE_RATE, events)
+    return timelines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline YAMNet scan of recorded clips")
+    parser.add_argument("dirs", nargs="*", default=SCAN_DIRS)
+    args = parser.parse_args()
+
+    index = json.loads(INDEX_FILE.read_text()) if INDEX_FILE.exists() else {}
+    todo = []
+    for d in args.dirs:
+        for path in sorted(Path(d).rglob("*")):
+            if path.suffix.lower() not in VIDEO_EXTS:
+                continue
+            st = path.stat()
+            entry = index.get(str(path))
+            if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                continue
+            todo.append((path, st))
+
+    if not todo:
+        print(f"Nothing new to scan ({len(index)} files already in {INDEX_FILE}).")
+        return
+
+    print(f"Loading YAMNet... {len(todo)} files to scan")
+    model = get_model(YAMNET_URL)
+    class_names = load_class_names(model)
+
+    stats = {str(path): st for path, st in todo}
+    batch, batch_samples, found, failed = [], 0, 0, 0
+
+    def flush():
+        nonlocal batch, batch_samples, found
+        if not batch:
+            return
+        for key, (duration, events) in score_batch(model, class_names, batch).items():
+            st = stats[key]
+            index[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                          "duration": round(duration, 2), "events": events}
+            found += bool(events)
+        INDEX_FILE.write_text(json.dumps(index, indent=1))
+        batch, batch_samples = [], 0
+
+    # Extraction runs ahead in the pool while the model scores the previous batch;
+    # submit in chunks so decoded audio for the whole archive never sits in memory.
+    chunk = EXTRACT_WORKERS * 4
+    with ThreadPoolExecutor(EXTRACT_WORKERS) as pool:
+        for start in range(0, len(todo), chunk):
+            part = todo[start:start + chunk]
+            for (path, _), audio in zip(part, pool.map(lambda t: extract_audio(t[0]), part)):
+                if audio is None:
+                    failed += 1
+                    continue
+                batch.append((str(path), audio))
+                batch_samples += len(audio)
+                if batch_samples >= BATCH_SECONDS * SAMPLE_RATE:
+                    flush()
+            print(f"  scanned {min(start + chunk, len(todo))}/{len(todo)}")
+        flush()
+
+    print(f"✅ Scanned {len(todo) - failed} files, {found} with cat sounds → {INDEX_FILE}")
+    if failed:
+        print(f"⚠️  {failed} files could not be decoded; they will be retried next run")
+
+
+if __name__ == "__main__":
+    main()
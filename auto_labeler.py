@@ -1,7 +1,8 @@
 import cv2
 import os
-from ultralytics import YOLO
+from model_registry import get_model
 from pathlib import Path
+from shard_writer import SHARD_OUTPUT, ImageWriter
 
 # --- CONFIGURATION ---
 BASE_DATASET_DIR = Path("dataset")
@@ -11,6 +12,7 @@ INPUT_FOLDERS = {
 }
 
 # Where the training data will live
+OUT_DIR = BASE_DATASET_DIR / "train"
 OUT_IMAGE_DIR = BASE_DATASET_DIR / "train" / "images"
 OUT_LABEL_DIR = BASE_DATASET_DIR / "train" / "labels"
 
@@ -18,18 +20,12 @@ MODEL_NAME = "yolo26n.pt"
 CONF_THRESHOLD = 0.50
 FRAMES_TO_SKIP = 15 # Extract 1 frame per second for 15fps video
 
-# Create directories
-OUT_IMAGE_DIR.mkdir(parents=True, exist_ok=True)
-OUT_LABEL_DIR.mkdir(parents=True, exist_ok=True)
-
-# Load model on M4 hardware
-model = YOLO(MODEL_NAME)
-
-def process_folder(folder_path, is_negative=False):
+def process_folder(folder_path, writer, is_negative=False):
     if not folder_path.exists():
         print(f"Skipping {folder_path}, folder not found.")
         return
 
+    model = get_model(MODEL_NAME)
     print(f"\n--- Processing {'NEGATIVES (Chickens)' if is_negative else 'POSITIVES (Cats)'} ---")
     
     for video_file in folder_path.glob("*.mp4"):
@@ -44,37 +40,43 @@ def process_folder(folder_path, is_negative=False):
                 break
             
             if frame_count % FRAMES_TO_SKIP == 0:
-                img_name = f"{base_name}_f{frame_count}.jpg"
-                txt_name = f"{base_name}_f{frame_count}.txt"
-                
-                img_path = OUT_IMAGE_DIR / img_name
-                txt_path = OUT_LABEL_DIR / txt_name
+                img_path = f"images/{base_name}_f{frame_count}.jpg"
+                txt_path = f"labels/{base_name}_f{frame_count}.txt"
 
                 if is_negative:
                     # FOR CHICKENS: Save image and a completely empty label file
-                    cv2.imwrite(str(img_path), frame)
-                    open(txt_path, 'w').close() 
+                    writer.write(img_path, frame)
+                    writer.write(txt_path, "")
                     saved_count += 1
                 else:
                     # FOR CATS: Run detection to assist labeling
                     results = model.predict(source=frame, device='mps', classes=[16], conf=CONF_THRESHOLD, verbose=False)
                     
                     if len(results[0].boxes) > 0:
-                        cv2.imwrite(str(img_path), frame)
-                        with open(txt_path, 'w') as f:
-                            for box in results[0].boxes:
-                                x_c, y_c, w, h = box.xywhn[0].tolist()
-                                f.write(f"0 {x_c:.6f} {y_c:.6f} {w:.6f} {h:.6f}\n")
+                        lines = []
+                        for box in results[0].boxes:
+                            x_c, y_c, w, h = box.xywhn[0].tolist()
+                            lines.append(f"0 {x_c:.6f} {y_c:.6f} {w:.6f} {h:.6f}\n")
+                        writer.write(img_path, frame)
+                        writer.write(txt_path, "".join(lines))
                         saved_count += 1
             
             frame_count += 1
         cap.release()
         print(f"Processed {video_file.name}: Saved {saved_count} frames")
 
-# Run the process
-process_folder(INPUT_FOLDERS["positives"], is_negative=False)
-process_folder(INPUT_FOLDERS["negatives"], is_negative=True)
+def main():
+    # Create directories (shard mode writes to shards/ instead)
+    if not SHARD_OUTPUT:
+        OUT_IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+        OUT_LABEL_DIR.mkdir(parents=True, exist_ok=True)
+
+    with ImageWriter(OUT_DIR) as writer:
+        process_folder(INPUT_FOLDERS["positives"], writer, is_negative=False)
+        process_folder(INPUT_FOLDERS["negatives"], writer, is_negative=True)
+
+    print("\nProcessing Complete!")
+    print(f"Wrote {writer.written} files to {writer.location}")
 
-print("\nProcessing Complete!")
-print(f"Images: {len(list(OUT_IMAGE_DIR.glob('*.jpg')))}")
-print(f"Labels: {len(list(OUT_LABEL_DIR.glob('*.txt')))}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,15 @@ import time
 import subprocess
 import csv
 import numpy as np
-import tensorflow as tf
-import tensorflow_hub as hub
 from scipy.io import wavfile
 from datetime import datetime
+from frame_bus import AudioBusReader
+from model_registry import get_model
 
 # --- CONFIGURATION ---
 RTSP_URL = "rtsp://localhost:8554/garden"
+YAMNET_URL = "https://tfhub.dev/google/yamnet/1"
+FRAME_BUS = os.getenv("FRAME_BUS")  # Share the decode with frame_bus.py instead of running ffmpeg here
 # 81=Cat, 82=Meow, 83=Caterwaul, 20=Crying/sobbing, 21=Baby cry
 TARGET_CLASSES = [81, 82, 83, 20, 21] 
 CONF_THRESHOLD = 0.25  
@@ -17,22 +19,23 @@ GAIN_FACTOR = 3.5      # Slightly increased boost for the 8kHz stream
 OUTPUT_DIR = "audio_recordings"
 LOG_FILE = "audio_log.txt"
 
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
-
-print(f"Loading YAMNet... Logging to {LOG_FILE}")
-model = hub.load('https://tfhub.dev/google/yamnet/1')
-class_map_path = model.class_map_path().numpy().decode('utf-8')
-
-class_names = []
-with open(class_map_path, 'r') as f:
-    reader = csv.reader(f)
-    next(reader) 
-    for row in reader:
-        if len(row) >= 3:
-            class_names.append(row[2])
+def load_class_names(model):
+    class_map_path = model.class_map_path().numpy().decode('utf-8')
+    class_names = []
+    with open(class_map_path, 'r') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            if len(row) >= 3:
+                class_names.append(row[2])
+    return class_names
 
 def get_audio_stream():
+    if FRAME_BUS:
+        try:
+            return AudioBusReader(FRAME_BUS)
+        except FileNotFoundError:
+            print(f"⚠️ Frame bus '{FRAME_BUS}' not running, opening {RTSP_URL} directly.")
     command = [
         'ffmpeg', '-i', RTSP_URL,
         '-vn', '-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1', '-f', 's16le', '-'
@@ -48,6 +51,12 @@ def log_message(message):
         f.write(formatted_msg + "\n")
 
 def main():
+    if not os.path.exists(OUTPUT_DIR):
+        os.makedirs(OUTPUT_DIR)
+
+    print(f"Loading YAMNet... Logging to {LOG_FILE}")
+    model = get_model(YAMNET_URL)
+    class_names = load_class_names(model)
     log_message(f"System Online. Listening on {RTSP_URL}...")
     stream = get_audio_stream()
     chunk_size = 16000 * 2 
@@ -1,11 +1,14 @@
+import argparse
 import cv2
 import time
 import os
 import requests
 from datetime import datetime
 from collections import deque
-from ultralytics import YOLO
 from dotenv import load_dotenv
+from model_registry import get_model
+from preview_server import PreviewServer
+from stream_ingest import WatchdogCapture
 
 load_dotenv()
 
@@ -19,6 +22,7 @@ DETECTIONS_DIR = "detections"
 CONF_THRESHOLD = 0.7
 ALERT_COOLDOWN = 60 
 VIDEO_BUFFER_SECONDS = 5 
+STREAM_OUTAGE_GRACE = 30  # Seconds of outage a clip may span before it's closed
 
 # Deterrent Logic
 DETERRENT_THRESHOLD = 15
@@ -26,11 +30,6 @@ HISTORY_WINDOW = 30
 identity_history = deque(maxlen=HISTORY_WINDOW)
 last_deterrent_time = 0
 
-os.makedirs(DETECTIONS_DIR, exist_ok=True)
-
-detector = YOLO(DETECTOR_MODEL)
-classifier = YOLO(CLASSIFIER_MODEL)
-
 def trigger_deterrent():
     if not ESP8266_IP:
         print("⚠️ ESP8266_IP not set in environment. Skipping deterrent trigger.")
@@ -49,117 +48,179 @@ def trigger_deterrent():
         print(f"❌ Error communicating with ESP8266: {e}")
         return False
 
-def run_monitor():
+def draw_annotations(frame, annotations):
+    """Draws boxes/labels and banner messages onto frame in place."""
+    detections, banners = annotations
+    for x1, y1, x2, y2, label, conf in detections:
+        # Red for stray, Green for residents
+        color = (0, 0, 255) if label == "horny_meow" else (0, 255, 0)
+
+        # Draw Bounding Box
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
+
+        # Draw Label Background (makes text easier to read)
+        label_str = f"{label.upper()} {conf:.2f}"
+        (text_w, text_h), _ = cv2.getTextSize(label_str, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+        cv2.rectangle(frame, (x1, y1 - text_h - 10), (x1 + text_w, y1), color, -1)
+
+        # Draw Text
+        cv2.putText(frame, label_str, (x1, y1 - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+    for text, y in banners:
+        cv2.putText(frame, text, (50, y), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
+
+def run_monitor(headless=False, preview_port=None, preview_host="127.0.0.1"):
     global last_deterrent_time
-    cap = cv2.VideoCapture(RTSP_URL)
+    os.makedirs(DETECTIONS_DIR, exist_ok=True)
+    # Loaded (and warmed up) on first use, once per process
+    detector = get_model(DETECTOR_MODEL)
+    classifier = get_model(CLASSIFIER_MODEL)
+    # Survives Wi-Fi drops and frozen streams; always hands us the newest frame
+    cap = WatchdogCapture(RTSP_URL)
     
     frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = int(cap.get(cv2.CAP_PROP_FPS)) or 20 
     
     video_writer = None
+    clip_frames = None
     recording_until = 0
+
+    # Preview renders on its own thread from the latest results; it never blocks this loop
+    preview = PreviewServer(preview_port, draw_annotations, host=preview_host) if preview_port else None
     
-    print("--- Garden Monitoring Active ---")
+    print(f"--- Garden Monitoring Active{' (headless)' if headless else ''} ---")
     
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret: break
-
-        results = detector(frame, verbose=False, device='mps')
-        
-        current_frame_identity = None
-        current_frame_conf = 0.0
-
-        for r in results:
-            for box in r.boxes:
-                if box.conf > CONF_THRESHOLD:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    
-                    # Identify the cat
-                    cat_crop = frame[y1:y2, x1:x2]
-                    if cat_crop.size == 0: continue
-                    
-                    id_results = classifier(cat_crop, verbose=False, device='mps')
-                    conf = id_results[0].probs.top1conf.item()
-                    label = id_results[0].names[id_results[0].probs.top1]
-
-                    # Update frame-level tracking for naming and deque
-                    # Change this part of your loop:
-                    if conf > current_frame_conf and conf > 0.85: # Added a 0.85 floor
-                        current_frame_conf = conf
-                        current_frame_identity = label
-                    
-                    # --- DRAW LABELS ON FRAME ---
-                    # Red for stray, Green for residents
-                    color = (0, 0, 255) if label == "horny_meow" else (0, 255, 0)
-                    
-                    # Draw Bounding Box
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
-                    
-                    # Draw Label Background (makes text easier to read)
-                    label_str = f"{label.upper()} {conf:.2f}"
-                    (text_w, text_h), _ = cv2.getTextSize(label_str, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
-                    cv2.rectangle(frame, (x1, y1 - text_h - 10), (x1 + text_w, y1), color, -1)
-                    
-                    # Draw Text
-                    cv2.putText(frame, label_str, (x1, y1 - 5), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-
-        # --- UPDATE HISTORY & DETERRENT LOGIC ---
-        if current_frame_identity:
-            identity_history.append(current_frame_identity)
-
-            # If we see a resident cat, clear the history so the horn won't fire
-            if current_frame_identity in ["orange", "squaky"]:
-                identity_history.clear()
-            
-            # Count how many times 'horny_meow' was seen in the recent window
-            stray_count = identity_history.count("horny_meow")
-            
-            # Trigger deterrent if threshold met and cooldown passed
-            if stray_count >= DETERRENT_THRESHOLD:
-                current_time = time.time()
-                if current_time - last_deterrent_time > ALERT_COOLDOWN:
-                    print(f"🚨 DETERRENT TRIGGERED! (Stray seen {stray_count}/{HISTORY_WINDOW} times)")
-                    cv2.putText(frame, "!!! DETERRENT TRIGGERED !!!", (50, 100), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
-                    # trigger_deterrent()
-                    last_deterrent_time = current_time
-                
-                # Visual indicator on frame that deterrent is active/ready
-                cv2.putText(frame, "!!! STRAY DETECTED - DETERRENT READY !!!", (50, 50), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
-
-        # --- VIDEO SAVING LOGIC ---
-        if current_frame_identity and current_frame_identity != "background":
-            recording_until = time.time() + VIDEO_BUFFER_SECONDS
-            
-            if video_writer is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                prob_int = int(current_frame_conf * 100)
-                filename = f"{current_frame_identity}_p{prob_int}_{timestamp}.mp4"
-                save_path = os.path.join(DETECTIONS_DIR, filename)
-                
-                fourcc = cv2.VideoWriter_fourcc(*'avc1')
-                video_writer = cv2.VideoWriter(save_path, fourcc, fps, (frame_width, frame_height))
-                print(f"📹 Recording: {filename}")
-
-        if video_writer is not None:
-            # We write the 'frame' AFTER drawing on it
-            video_writer.write(frame)
-            if time.time() > recording_until:
-                video_writer.release()
-                video_writer = None
-                print("🏁 Saved.")
-
-        cv2.imshow("Garden Monitor", frame)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
-
-    if video_writer: video_writer.release()
-    cap.release()
-    cv2.destroyAllWindows()
+    try:
+        while cap.isOpened():
+            ret, frame = cap.read()
+            if not ret:
+                # Stream outage: the watchdog reconnects; keep any open clip going
+                if video_writer is not None and time.time() > recording_until + STREAM_OUTAGE_GRACE:
+                    clip_frames.close()
+                    video_writer.release()
+                    video_writer = None
+                    print("🏁 Saved (stream lost).")
+                continue
+
+            results = detector(frame, verbose=False, device='mps')
+
+            current_frame_identity = None
+            current_frame_conf = 0.0
+            detections = []
+            banners = []
+
+            for r in results:
+                for box in r.boxes:
+                    if box.conf > CONF_THRESHOLD:
+                        x1, y1, x2, y2 = map(int, box.xyxy[0])
+
+                        # Identify the cat
+                        cat_crop = frame[y1:y2, x1:x2]
+                        if cat_crop.size == 0: continue
+
+                        id_results = classifier(cat_crop, verbose=False, device='mps')
+                        conf = id_results[0].probs.top1conf.item()
+                        label = id_results[0].names[id_results[0].probs.top1]
+
+                        # Update frame-level tracking for naming and deque
+                        # Change this part of your loop:
+                        if conf > current_frame_conf and conf > 0.85: # Added a 0.85 floor
+                            current_frame_conf = conf
+                            current_frame_identity = label
+
+                        # Collected here, drawn later only if someone will see the frame
+                        detections.append((x1, y1, x2, y2, label, conf))
+
+            # --- UPDATE HISTORY & DETERRENT LOGIC ---
+            if current_frame_identity:
+                identity_history.append(current_frame_identity)
+
+                # If we see a resident cat, clear the history so the horn won't fire
+                if current_frame_identity in ["orange", "squaky"]:
+                    identity_history.clear()
+
+                # Count how many times 'horny_meow' was seen in the recent window
+                stray_count = identity_history.count("horny_meow")
+
+                # Trigger deterrent if threshold met and cooldown passed
+                if stray_count >= DETERRENT_THRESHOLD:
+                    current_time = time.time()
+                    if current_time - last_deterrent_time > ALERT_COOLDOWN:
+                        print(f"🚨 DETERRENT TRIGGERED! (Stray seen {stray_count}/{HISTORY_WINDOW} times)")
+                        banners.append(("!!! DETERRENT TRIGGERED !!!", 100))
+                        # trigger_deterrent()
+                        last_deterrent_time = current_time
+
+                    # Visual indicator on frame that deterrent is active/ready
+                    banners.append(("!!! STRAY DETECTED - DETERRENT READY !!!", 50))
+
+            annotations = (detections, banners)
+            if preview:
+                preview.publish(frame, annotations)
+
+            # --- VIDEO SAVING LOGIC ---
+            if current_frame_identity and current_frame_identity != "background":
+                recording_until = time.time() + VIDEO_BUFFER_SECONDS
+
+                if video_writer is None:
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    prob_int = int(current_frame_conf * 100)
+                    filename = f"{current_frame_identity}_p{prob_int}_{timestamp}.mp4"
+                    save_path = os.path.join(DETECTIONS_DIR, filename)
+
+                    fourcc = cv2.VideoWriter_fourcc(*'avc1')
+                    video_writer = cv2.VideoWriter(save_path, fourcc, fps, (frame_width, frame_height))
+                    # Record every frame from here on, not just the ones we had time
+                    # to detect on, so the clip plays back at real speed
+                    clip_frames = cap.tap(frame)
+                    print(f"📹 Recording: {filename}")
+
+            # Only pay for drawing when the frame is shown
+            if not headless:
+                if not frame.flags.writeable:
+                    # Frame bus hands out read-only shared memory
+                    frame = frame.copy()
+                draw_annotations(frame, annotations)
+
+            if video_writer is not None:
+                # Tap frames are copies; frames the detector skipped get the latest boxes
+                for clip_frame in clip_frames.drain():
+                    draw_annotations(clip_frame, annotations)
+                    video_writer.write(clip_frame)
+                if time.time() > recording_until:
+                    clip_frames.close()
+                    video_writer.release()
+                    video_writer = None
+                    print("🏁 Saved.")
+
+            if not headless:
+                cv2.imshow("Garden Monitor", frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+    except KeyboardInterrupt:
+        print("Stopping monitor...")
+    finally:
+        if clip_frames: clip_frames.close()
+        if video_writer: video_writer.release()
+        if preview: preview.close()
+        print(f"📈 Ingest metrics: {cap.metrics()}")
+        cap.release()
+        if not headless:
+            cv2.destroyAllWindows()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Garden cat monitor")
+    parser.add_argument("--headless", action="store_true",
+                        help="No window; only draw overlays when recording or previewing")
+    parser.add_argument("--preview-port", type=int, default=None,
+                        help="Serve an MJPEG preview on this port (e.g. 8080)")
+    parser.add_argument("--preview-lan", action="store_true",
+                        help="Serve the preview on all interfaces instead of localhost only")
+    args = parser.parse_args(argv)
+    run_monitor(headless=args.headless, preview_port=args.preview_port,
+                preview_host="0.0.0.0" if args.preview_lan else "127.0.0.1")
 
 if __name__ == "__main__":
-    run_monitor()
\ No newline at end of file
+    main()
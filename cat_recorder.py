@@ -13,7 +13,9 @@ from typing import Optional
 
 import cv2
 from dotenv import load_dotenv
-from ultralytics import YOLO
+
+from model_registry import get_model
+from stream_ingest import WatchdogCapture
 
 load_dotenv()
 
@@ -21,6 +23,7 @@ load_dotenv()
 # CONFIGURATION
 # ---------------------------------------------------------------------------
 RTSP_URL        = os.getenv("RTSP_URL", "")
+FRAME_BUS       = os.getenv("FRAME_BUS", "")      # Read from frame_bus.py instead of the camera
 OUTPUT_DIR      = Path("recordings")
 # Pointing to your new best.pt from the M4 training run
 MODEL_PATH      = "models/detector/best.pt" 
@@ -30,7 +33,8 @@ CONF_THRESHOLD  = 0.50
 # In your custom model, 'cat' is index 0
 CAT_CLASS_ID    = 0                            
 ABSENCE_TIMEOUT = 4.0                          
-RECONNECT_DELAY = 5                            
+OUTAGE_GRACE    = 30.0                         # Keep a clip open through stream drops this short
+RECONNECT_DELAY = 5                            # Only after unexpected errors; stalls are handled by the watchdog
 CODEC           = "avc1"                       
 # ---------------------------------------------------------------------------
 
@@ -42,13 +46,9 @@ logging.basicConfig(
 log = logging.getLogger(__name__)
 
 def connect_stream(url: str):
-    cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
-    cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 5000)
-    cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, 5000)
-    os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", "rtsp_transport;tcp")
-
-    if not cap.isOpened():
-        raise RuntimeError(f"Cannot open stream: {url}")
+    # Reads from the camera, or the frame bus when FRAME_BUS is set; stall
+    # detection, draining and jittered reconnects happen inside the watchdog.
+    cap = WatchdogCapture(url)
 
     width  = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
@@ -91,17 +91,17 @@ def detect_cat(results) -> Optional[tuple[float, float]]:
     return (min(cat_confs), max(cat_confs))
 
 def main() -> None:
-    if not RTSP_URL:
+    if not RTSP_URL and not FRAME_BUS:
         log.error("RTSP_URL not set in .env")
         return
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
     log.info("Loading Custom Model: %s", MODEL_PATH)
-    model = YOLO(MODEL_PATH)
+    model = get_model(MODEL_PATH)
 
     while True:
-        cap, writer, clip_path = None, None, None
+        cap, writer, clip_path, clip_frames = None, None, None, None
         is_recording, last_seen_ts = False, 0.0
 
         try:
@@ -109,25 +109,39 @@ def main() -> None:
 
             while True:
                 ret, frame = cap.read()
+                now = time.monotonic()
                 if not ret or frame is None:
-                    break
+                    # Outage: the watchdog is reconnecting. Don't split the clip
+                    # over a short drop; give up on it after OUTAGE_GRACE.
+                    if is_recording and (now - last_seen_ts) > OUTAGE_GRACE:
+                        for clip_frame in clip_frames.drain():
+                            writer.write(clip_frame)
+                        clip_frames.close()
+                        writer.release()
+                        log.info("Recording saved (stream lost) → %s", clip_path.name)
+                        is_recording = False
+                    continue
 
                 # We only ask the model for Class 0
                 results = model(frame, device=DEVICE, classes=[0], verbose=False)
                 cat_conf = detect_cat(results)
                 cat_present = cat_conf is not None
-                now = time.monotonic()
 
                 if cat_present:
                     last_seen_ts = now
                     if not is_recording:
                         log.info("Cat detected!")
                         writer, clip_path = open_writer(width, height, fps, cat_conf)
+                        # This frame and every later one, including those the
+                        # detector skips, so the clip plays back at the stream's fps
+                        clip_frames = cap.tap(frame)
                         is_recording = True
 
                 if is_recording:
-                    writer.write(frame)
+                    for clip_frame in clip_frames.drain():
+                        writer.write(clip_frame)
                     if not cat_present and (now - last_seen_ts) > ABSENCE_TIMEOUT:
+                        clip_frames.close()
                         writer.release()
                         log.info("Recording saved → %s", clip_path.name)
                         is_recording = False
@@ -137,8 +151,11 @@ def main() -> None:
         except Exception as exc:
             log.error("Error: %s", exc)
         finally:
+            if clip_frames: clip_frames.close()
             if writer: writer.release()
-            if cap: cap.release()
+            if cap:
+                log.info("Ingest metrics: %s", cap.metrics())
+                cap.release()
         
         time.sleep(RECONNECT_DELAY)
 
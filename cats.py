@@ -0,0 +1,150 @@
+"""
+cats.py — One entry point for all the garden-cat tools
+======================================================
+
+    python cats.py monitor [--audio] [--headless] [--preview-port 8080]
+    python cats.py record                  # cat_recorder
+    python cats.py label                   # auto_labeler (detector dataset)
+    python cats.py prepare                 # dataset_preparation (identity crops)
+    python cats.py sort [--clips]          # identity_sorter / dataset_prep
+    python cats.py train [--incremental]   # train_classifier / incremental_train
+    python cats.py eval [weights ...]      # evaluate_models
+    python cats.py serve                   # keep YOLO models resident
+
+Tool modules are imported only for the chosen subcommand and models are
+loaded lazily through model_registry, so `--help` and `--dry-run` return
+without touching torch/tensorflow. Options the CLI doesn't know are passed
+on to the tool. Startup timings are printed when the command finishes.
+"""
+
+import time
+
+_T0 = time.perf_counter()
+
+import argparse
+import importlib
+import logging
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# subcommand -> (module, function, config attributes naming the models it uses)
+COMMANDS = {
+    "monitor":    ("cat_monitor", "main", ["DETECTOR_MODEL", "CLASSIFIER_MODEL"]),
+    "audio":      ("cat_audio_monitor", "main", ["YAMNET_URL"]),
+    "record":     ("cat_recorder", "main", ["MODEL_PATH"]),
+    "label":      ("auto_labeler", "main", ["MODEL_NAME"]),
+    "prepare":    ("dataset_preparation", "main", ["MODEL_PATH"]),
+    "sort":       ("identity_sorter", "sort_images", []),
+    "sort-clips": ("dataset_prep", "sort_clips", []),
+    "train":      ("train_classifier", "train_cat_identity_model", []),
+    "train-incremental": ("incremental_train", "main", []),
+    "eval":       ("evaluate_models", "main", []),
+}
+# Tools whose entry point takes an argv list for their own options
+PASS_ARGV = {"monitor", "train-incremental", "eval"}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    # --dry-run is accepted before or after the subcommand
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--dry-run", action="store_true", default=argparse.SUPPRESS,
+                        help="Show which tool and models would run, without loading anything")
+    parser = argparse.ArgumentParser(description="Garden cat tools", parents=[common])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add(name: str, help_text: str) -> argparse.ArgumentParser:
+        return sub.add_parser(name, help=help_text, parents=[common])
+
+    p = add("monitor", "Live detection + deterrent (cat_monitor)")
+    p.add_argument("--audio", action="store_true", help="Run the YAMNet audio monitor instead")
+    add("record", "Record clips when a cat is present (cat_recorder)")
+    add("label", "Auto-label detector training frames (auto_labeler)")
+    add("prepare", "Crop cats for identity training (dataset_preparation)")
+    p = add("sort", "Sort crops into identity folders (identity_sorter)")
+    p.add_argument("--clips", action="store_true", help="Sort raw clips instead (dataset_prep)")
+    p = add("train", "Train the identity classifier (train_classifier)")
+    p.add_argument("--incremental", action="store_true",
+                   help="Fine-tune on new samples + replay buffer (incremental_train)")
+    add("eval", "Compare classifier checkpoints (evaluate_models)")
+    p = add("serve", "Keep models resident for short-lived tools")
+    p.add_argument("--address", default="127.0.0.1:6001")
+    return parser
+
+
+def resolve(args) -> str:
+    if args.command == "monitor" and args.audio:
+        return "audio"
+    if args.command == "sort" and args.clips:
+        return "sort-clips"
+    if args.command == "train" and args.incremental:
+        return "train-incremental"
+    return args.command
+
+
+def report_timings(t_parse: float, t_import: float, t_done: float) -> None:
+    import model_registry
+
+    load = sum(t["load_ms"] for t in model_registry.timings.values())
+    warm = sum(t["warmup_ms"] for t in model_registry.timings.values())
+    print(f"\n⏱  cli {1000 * (t_parse - _T0):.0f} ms | "
+          f"tool import {1000 * (t_import - t_parse):.0f} ms | "
+          f"models {load:.0f} ms load + {warm:.0f} ms warm-up | "
+          f"total {t_done - _T0:.1f} s", file=sys.stderr)
+    for ref, t in model_registry.timings.items():
+        print(f"   {ref}: {t['load_ms']:.0f} ms load, {t['warmup_ms']:.0f} ms warm-up",
+              file=sys.stderr)
+
+
+def main(argv=None) -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    args, extra = build_parser().parse_known_args(argv)
+    dry_run = getattr(args, "dry_run", False)
+    t_parse = time.perf_counter()
+
+    if args.command == "serve":
+        import cat_monitor
+        import model_registry
+
+        preload = [cat_monitor.DETECTOR_MODEL, cat_monitor.CLASSIFIER_MODEL]
+        if dry_run:
+            print(f"Would serve on {args.address}: {', '.join(preload)}")
+            return
+        try:
+            model_registry.serve(args.address, preload)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    command = resolve(args)
+    module_name, func_name, model_attrs = COMMANDS[command]
+    if extra and command not in PASS_ARGV:
+        build_parser().error(f"unrecognized arguments for {command}: {' '.join(extra)}")
+
+    module = importlib.import_module(module_name)
+    t_import = time.perf_counter()
+
+    if dry_run:
+        models = [str(getattr(module, a)) for a in model_attrs]
+        print(f"Would run {module_name}.{func_name}({' '.join(extra)})")
+        print(f"Models: {', '.join(models) if models else 'none'}")
+        report_timings(t_parse, t_import, time.perf_counter())
+        return
+
+    func = getattr(module, func_name)
+    try:
+        func(extra) if command in PASS_ARGV else func()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        report_timings(t_parse, t_import, time.perf_counter())
+
+
+if __name__ == "__main__":
+    main()
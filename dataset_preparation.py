@@ -1,7 +1,8 @@
 import cv2
 import os
 import shutil
-from ultralytics import YOLO
+from model_registry import get_model
+from shard_writer import SHARD_OUTPUT, ImageWriter
 
 # --- CONFIGURATION ---
 MODEL_PATH = "models/chicken-proof/best.pt"
@@ -10,14 +11,10 @@ NEG_VIDEOS = "dataset/negatives"   # Videos with chickens/nothing
 OUTPUT_DIR = "training_data"
 CONF_THRESHOLD = 0.5
 
-# Initialize
-model = YOLO(MODEL_PATH)
 classes = ["stray", "resident_1", "resident_2", "background"]
 
-for cls in classes:
-    os.makedirs(os.path.join(OUTPUT_DIR, cls), exist_ok=True)
-
-def process_videos(video_dir, is_negative=False):
+def process_videos(video_dir, writer, is_negative=False):
+    model = get_model(MODEL_PATH)  # Loaded once, on first use
     files = [f for f in os.listdir(video_dir) if f.endswith(('.mp4', '.mov'))]
     
     for v_name in files:
@@ -35,8 +32,7 @@ def process_videos(video_dir, is_negative=False):
                 if is_negative:
                     # If it's a negative video and the model "lies" to us, save it as background
                     if len(results[0].boxes) > 0:
-                        save_path = f"{OUTPUT_DIR}/background/bg_{v_name}_{frame_idx}.jpg"
-                        cv2.imwrite(save_path, frame)
+                        writer.write(f"background/bg_{v_name}_{frame_idx}.jpg", frame)
                 else:
                     # If it's a positive video, crop the cat for identification
                     for i, box in enumerate(results[0].boxes):
@@ -44,15 +40,25 @@ def process_videos(video_dir, is_negative=False):
                             b = box.xyxy[0].cpu().numpy().astype(int)
                             crop = frame[b[1]:b[3], b[0]:b[2]]
                             # Save to stray initially, you'll sort them manually later
-                            save_path = f"{OUTPUT_DIR}/stray/crop_{v_name}_{frame_idx}_{i}.jpg"
-                            cv2.imwrite(save_path, crop)
+                            writer.write(f"stray/crop_{v_name}_{frame_idx}_{i}.jpg", crop)
             frame_idx += 1
         cap.release()
         print(f"Done processing {v_name}")
 
+def main():
+    # Initialize (shard mode writes to shards/ instead)
+    if not SHARD_OUTPUT:
+        for cls in classes:
+            os.makedirs(os.path.join(OUTPUT_DIR, cls), exist_ok=True)
+
+    # JPEG encoding/writing happens in the background (and into shards if SHARD_OUTPUT=1)
+    with ImageWriter(OUTPUT_DIR) as writer:
+        print("💎 Processing Positives (Crops)...")
+        process_videos(POS_VIDEOS, writer, is_negative=False)
+
+        print("🐔 Processing Negatives (Backgrounds)...")
+        process_videos(NEG_VIDEOS, writer, is_negative=True)
+    print(f"Saved {writer.written} images to {writer.location}")
+
 if __name__ == "__main__":
-    print("💎 Processing Positives (Crops)...")
-    process_videos(POS_VIDEOS, is_negative=False)
-    
-    print("🐔 Processing Negatives (Backgrounds)...")
-    process_videos(NEG_VIDEOS, is_negative=True)
\ No newline at end of file
+    main()
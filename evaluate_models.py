@@ -0,0 +1,203 @@
+"""
+evaluate_models.py — Compare classifier checkpoints on the same held-out set
+============================================================================
+
+Runs every checkpoint over the fixed held-out split (the same content-hash
+split incremental_train.py validates on) in large CPU batches, straight from
+the pre-decoded training cache. Per-image predictions are cached on disk by
+(model hash, image hash), so adding a checkpoint only computes its column.
+
+Images listed in a run's train_manifest.json are left out of that model's
+column. Checkpoints without a manifest (runs from before the held-out split,
+models/classify/*.pt) may have trained on the held-out images; they are
+marked contaminated in the table and in eval_report.json.
+
+Reports per model: top-1 accuracy, horny_meow <-> orange confusion, the
+top-1 margin distribution, batch-1 CPU latency and batched throughput.
+
+Usage: python evaluate_models.py [weights.pt ...] [--all-images]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from incremental_train import MANIFEST_NAME, is_held_out
+from training_cache import DATA_DIR, TrainingCache, file_hash
+
+# ---------------------------------------------------------------------------
+# CONFIGURATION
+# ---------------------------------------------------------------------------
+RUNS_DIR      = Path("runs/classify")
+EXTRA_MODELS  = Path("models/classify")
+PRED_CACHE    = Path("eval_cache")             # <model_hash>.json per checkpoint
+REPORT_FILE   = Path("eval_report.json")
+IMGSZ         = 320
+BATCH         = 64
+LATENCY_RUNS  = 20                             # Single-image predicts timed per model
+DEVICE        = "cpu"                          # Latency numbers are for CPU
+FOCUS_PAIR    = ("horny_meow", "orange")       # The confusion that matters for the horn
+MARGIN_BINS   = [0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0]
+# ---------------------------------------------------------------------------
+
+
+def default_checkpoints() -> list[Path]:
+    """best.pt of every run (last.pt if the run never wrote one) plus models/classify/*.pt."""
+    found = []
+    for run in sorted(RUNS_DIR.glob("*/weights")):
+        best, last = run / "best.pt", run / "last.pt"
+        if best.exists():
+            found.append(best)
+        elif last.exists():
+            found.append(last)
+    found += sorted(EXTRA_MODELS.glob("*.pt"))
+    return found
+
+
+def trained_on(weights: Path) -> Optional[set[str]]:
+    """Hashes in the run's train manifest, or None if the checkpoint has none."""
+    manifest = Path(weights).parent.parent / MANIFEST_NAME
+    if not manifest.exists():
+        return None
+    return set(json.loads(manifest.read_text()))
+
+
+def load_predictions(model_hash: str) -> dict:
+    path = PRED_CACHE / f"{model_hash}.json"
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"names": None, "preds": {}, "timing": {"images": 0, "seconds": 0.0}}
+
+
+def save_predictions(model_hash: str, data: dict) -> None:
+    PRED_CACHE.mkdir(parents=True, exist_ok=True)
+    tmp = PRED_CACHE / f"{model_hash}.tmp"
+    tmp.write_text(json.dumps(data))
+    tmp.replace(PRED_CACHE / f"{model_hash}.json")
+
+
+def predict_missing(weights: Path, model_hash: str, cache: TrainingCache,
+                    samples: list[tuple[str, str]]) -> dict:
+    """Fill in predictions for images this checkpoint hasn't scored yet."""
+    data = load_predictions(model_hash)
+    todo = [h for h, _ in samples if h not in data["preds"]]
+    if not todo and "latency_ms" in data["timing"]:
+        return data
+
+    from ultralytics import YOLO
+
+    model = YOLO(str(weights))
+    # Warm-up so one-time setup doesn't land in the latency numbers
+    model.predict(np.zeros((IMGSZ, IMGSZ, 3), np.uint8), imgsz=IMGSZ, device=DEVICE, verbose=False)
+    data["names"] = {int(k): v for k, v in model.names.items()}
+
+    rows = cache.index["rows"]
+    if "latency_ms" not in data["timing"]:
+        # One frame at a time, as the monitor runs it; the batched numbers
+        # below are throughput, not latency.
+        times = []
+        for h, _ in samples[:LATENCY_RUNS]:
+            image = np.ascontiguousarray(cache.image(rows[h]))
+            t0 = time.perf_counter()
+            model.predict(image, imgsz=IMGSZ, device=DEVICE, verbose=False)
+            times.append(time.perf_counter() - t0)
+        data["timing"]["latency_ms"] = 1000 * float(np.median(times)) if times else 0.0
+
+    for start in range(0, len(todo), BATCH):
+        batch = todo[start:start + BATCH]
+        images = [np.ascontiguousarray(cache.image(rows[h])) for h in batch]
+        t0 = time.perf_counter()
+        results = model.predict(images, imgsz=IMGSZ, device=DEVICE, batch=BATCH, verbose=False)
+        data["timing"]["seconds"] += time.perf_counter() - t0
+        data["timing"]["images"] += len(batch)
+        for h, r in zip(batch, results):
+            data["preds"][h] = [round(float(p), 5) for p in r.probs.data.tolist()]
+        print(f"  {weights}: {min(start + BATCH, len(todo))}/{len(todo)}", end="\r")
+    print()
+    save_predictions(model_hash, data)
+    return data
+
+
+def summarize(data: dict, samples: list[tuple[str, str]]) -> dict:
+    names = {int(k): v for k, v in data["names"].items()}
+    labels = sorted({label for _, label in samples} | set(names.values()))
+    confusion = {t: {p: 0 for p in labels} for t in labels}
+    margins, correct = [], 0
+
+    for h, true_label in samples:
+        probs = np.asarray(data["preds"][h])
+        order = np.argsort(probs)[::-1]
+        pred = names[int(order[0])]
+        confusion[true_label][pred] += 1
+        correct += pred == true_label
+        margins.append(float(probs[order[0]] - (probs[order[1]] if len(order) > 1 else 0.0)))
+
+    a, b = FOCUS_PAIR
+    timing = data["timing"]
+    margins = np.asarray(margins)
+    hist, _ = np.histogram(margins, bins=MARGIN_BINS)
+    return {
+        "accuracy": correct / max(1, len(samples)),
+        "confusion": confusion,
+        "focus": {f"{a}->{b}": confusion.get(a, {}).get(b, 0),
+                  f"{b}->{a}": confusion.get(b, {}).get(a, 0)},
+        "margin": {
+            "p10": float(np.percentile(margins, 10)) if len(margins) else 0.0,
+            "median": float(np.median(margins)) if len(margins) else 0.0,
+            "histogram": dict(zip([f"{lo:.2f}-{hi:.2f}" for lo, hi in
+                                   zip(MARGIN_BINS, MARGIN_BINS[1:])], hist.tolist())),
+        },
+        "images": len(samples),
+        "latency_ms": timing.get("latency_ms", 0.0),
+        "batch_ms_per_image": 1000 * timing["seconds"] / max(1, timing["images"]),
+        "images_per_sec": timing["images"] / max(1e-9, timing["seconds"]),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare classifier checkpoints")
+    parser.add_argument("weights", nargs="*", type=Path, help="Checkpoints (default: all)")
+    parser.add_argument("--all-images", action="store_true",
+                        help="Evaluate on all of training_data, not just the held-out split")
+    args = parser.parse_args(argv)
+
+    cache = TrainingCache(imgsz=IMGSZ)
+    cache.update(DATA_DIR)
+    samples = sorted({(f["hash"], f["label"]) for f in cache.index["files"].values()
+                      if args.all_images or is_held_out(f["hash"])})
+    if not samples:
+        print("No images to evaluate on. Is training_data/ empty?")
+        return
+    checkpoints = args.weights or default_checkpoints()
+    print(f"📊 Evaluating {len(checkpoints)} checkpoints on {len(samples)} images")
+
+    report = {}
+    for weights in checkpoints:
+        seen = trained_on(weights)
+        own = samples if seen is None else [s for s in samples if s[0] not in seen]
+        data = predict_missing(weights, file_hash(weights), cache, own)
+        report[str(weights)] = summarize(data, own)
+        report[str(weights)]["contaminated"] = seen is None
+
+    a, b = FOCUS_PAIR
+    print(f"\n{'model':<55} {'images':>6} {'acc':>6} {a[:6] + '>' + b[:6]:>14} "
+          f"{b[:6] + '>' + a[:6]:>14} {'margin p10':>10} {'lat ms':>7} {'img/s':>7}")
+    for name, r in report.items():
+        flag = "*" if r["contaminated"] else " "
+        print(f"{name:<55} {r['images']:>6} {r['accuracy']:>5.3f}{flag} "
+              f"{r['focus'][f'{a}->{b}']:>14} {r['focus'][f'{b}->{a}']:>14} "
+              f"{r['margin']['p10']:>10.3f} {r['latency_ms']:>7.2f} {r['images_per_sec']:>7.1f}")
+
+    if any(r["contaminated"] for r in report.values()):
+        print(f"\n* no {MANIFEST_NAME}: this model may have trained on these images, "
+              f"so its accuracy is optimistic")
+    REPORT_FILE.write_text(json.dumps(report, indent=2))
+    print(f"\nFull report (confusion matrices, margin histograms) → {REPORT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import cv2
 import os
+from shard_writer import ImageWriter
 
 # --- SETTINGS ---
 video_path = "detections/horny_meow_p92_20260226_185224.mp4"
@@ -9,32 +10,31 @@ start_sec = 0  # Start just before the error
 end_sec = 1    # End just after the error
 
 # --- EXECUTION ---
-if not os.path.exists(output_folder):
-    os.makedirs(output_folder)
-
 cap = cv2.VideoCapture(video_path)
 fps = cap.get(cv2.CAP_PROP_FPS)
 start_frame = int(start_sec * fps)
 end_frame = int(end_sec * fps)
 
 cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+class_folder = os.path.basename(output_folder)
 
 count = 0
-while cap.isOpened():
-    frame_no = cap.get(cv2.CAP_PROP_POS_FRAMES)
-    ret, frame = cap.read()
+with ImageWriter(os.path.dirname(output_folder)) as writer:
+    while cap.isOpened():
+        frame_no = cap.get(cv2.CAP_PROP_POS_FRAMES)
+        ret, frame = cap.read()
     
-    if not ret or frame_no > end_frame:
-        break
+        if not ret or frame_no > end_frame:
+            break
 
-    # Save every 5th frame to avoid nearly identical images
-    if count % 5 == 0:
-        # Use part of the filename and frame number for traceability
-        img_name = f"hard_example_{actual_class}_{int(frame_no)}_video{video_path.split('/')[-1].split('.')[0]}.jpg"
-        cv2.imwrite(os.path.join(output_folder, img_name), frame)
-        print(f"Saved: {img_name}")
+        # Save every 5th frame to avoid nearly identical images
+        if count % 5 == 0:
+            # Use part of the filename and frame number for traceability
+            img_name = f"hard_example_{actual_class}_{int(frame_no)}_video{video_path.split('/')[-1].split('.')[0]}.jpg"
+            writer.write(f"{class_folder}/{img_name}", frame)
+            print(f"Saved: {img_name}")
     
-    count += 1
+        count += 1
 
 cap.release()
-print(f"✅ Extraction complete. Added to {output_folder}")
\ No newline at end of file
+print(f"✅ Extraction complete. Added to {writer.location}")
\ No newline at end of file
@@ -0,0 +1,481 @@
+"""
+frame_bus.py — Single-ingest shared-memory frame/audio bus
+==========================================================
+
+One ingest process connects to the camera, demuxes and decodes the RTSP
+stream once (a single ffmpeg process with a video and an audio output) and
+publishes BGR frames and 16 kHz mono PCM into `multiprocessing.shared_memory`
+ring buffers. Any number of consumers (cat_monitor, cat_recorder,
+record_garden, cat_audio_monitor) attach by name and read frames as
+zero-copy numpy views.
+
+Run the ingest:       python frame_bus.py
+Point consumers at it: FRAME_BUS=catbus in .env (unset = direct RTSP as before)
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ---------------------------------------------------------------------------
+# CONFIGURATION
+# ---------------------------------------------------------------------------
+RTSP_URL          = os.getenv("RTSP_URL", "")
+BUS_NAME          = os.getenv("FRAME_BUS") or "catbus"
+VIDEO_SLOTS       = 8          # Frames kept in the ring (~0.5 s at 15 fps)
+AUDIO_SLOTS       = 64         # Audio chunks kept in the ring (6.4 s)
+AUDIO_RATE        = 16000      # YAMNet expects 16 kHz mono
+AUDIO_CHUNK       = 1600       # Samples per chunk (100 ms)
+RECONNECT_DELAY   = 5
+READ_TIMEOUT      = 5.0        # Seconds a consumer waits for a new frame
+# ---------------------------------------------------------------------------
+
+# Header layout (int64 slots). Everything a consumer needs to attach lives
+# in the header so readers never have to talk to the ingest process.
+_H_WRITE_SEQ = 0   # Sequence number of the newest complete item (-1 = none)
+_H_SLOTS     = 1
+_H_DIM0      = 2   # Video: height   | Audio: samples per chunk
+_H_DIM1      = 3   # Video: width    | Audio: sample rate
+_H_DIM2      = 4   # Video: channels | Audio: unused
+_H_FPS_MILLI = 5   # Video: fps * 1000
+_H_GEN       = 6   # Creation id, written last (0 = still initialising)
+_H_SIZE      = 7
+
+log = logging.getLogger(__name__)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing segment without letting this process unlink it on exit."""
+    shm = shared_memory.SharedMemory(name=name)
+    if sys.version_info < (3, 13):
+        # Before 3.13 every attaching process registers the segment with its
+        # resource tracker, which would destroy it when a consumer exits.
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class _Ring:
+    """
+    Fixed-size ring of equally shaped items with per-slot sequence numbers.
+
+    Segment layout: header[_H_SIZE] | slot_seq[slots] | data[slots, *shape]
+    A slot's sequence number is set to -1 while it is being written, so a
+    reader can tell a torn item from a valid one.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, slots: int,
+                 shape: tuple[int, ...], dtype):
+        self.shm = shm
+        self.slots = slots
+        self.shape = shape
+        buf = shm.buf
+        self.header = np.ndarray((_H_SIZE,), dtype=np.int64, buffer=buf)
+        self.slot_seq = np.ndarray((slots,), dtype=np.int64, buffer=buf,
+                                   offset=_H_SIZE * 8)
+        self.data = np.ndarray((slots, *shape), dtype=dtype, buffer=buf,
+                               offset=(_H_SIZE + slots) * 8)
+
+    @staticmethod
+    def nbytes(slots: int, shape: tuple[int, ...], dtype) -> int:
+        return (_H_SIZE + slots) * 8 + slots * int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+    @classmethod
+    def create(cls, name: str, slots: int, shape: tuple[int, ...], dtype,
+               fields: dict[int, int]) -> "_Ring":
+        """New segment; `fields` (dims, fps) are in place before _H_GEN is published."""
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True,
+                                         size=cls.nbytes(slots, shape, dtype))
+        ring = cls(shm, slots, shape, dtype)
+        ring.header[:] = 0
+        ring.header[_H_WRITE_SEQ] = -1
+        ring.header[_H_SLOTS] = slots
+        for index, value in fields.items():
+            ring.header[index] = value
+        ring.slot_seq[:] = -1
+        ring.header[_H_GEN] = time.time_ns()
+        return ring
+
+    def publish(self, seq: int, item: np.ndarray) -> None:
+        slot = seq % self.slots
+        self.slot_seq[slot] = -1
+        self.data[slot] = item
+        self.slot_seq[slot] = seq
+        self.header[_H_WRITE_SEQ] = seq
+
+    def latest(self) -> int:
+        return int(self.header[_H_WRITE_SEQ])
+
+    def get(self, seq: int) -> Optional[np.ndarray]:
+        """Zero-copy view of item `seq`, or None if it was overwritten or is mid-write."""
+        slot = seq % self.slots
+        if self.slot_seq[slot] != seq:
+            return None
+        return self.data[slot]
+
+    def close(self) -> None:
+        # Drop our numpy views first, otherwise the mmap refuses to close.
+        self.header = self.slot_seq = self.data = None
+        self.shm.close()
+
+
+# ---------------------------------------------------------------------------
+# INGEST (producer)
+# ---------------------------------------------------------------------------
+def probe_stream(url: str) -> dict:
+    """Ask ffprobe for the video size/fps and whether the stream carries audio."""
+    cmd = [
+        "ffprobe", "-v", "error", "-rtsp_transport", "tcp",
+        "-show_entries", "stream=codec_type,width,height,avg_frame_rate",
+        "-of", "json", url,
+    ]
+    out = subprocess.run(cmd, capture_output=True, timeout=15, check=True).stdout
+    streams = json.loads(out).get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if video is None:
+        raise RuntimeError(f"No video stream found at {url}")
+
+    num, _, den = video.get("avg_frame_rate", "15/1").partition("/")
+    fps = float(num) / float(den or 1) if float(num or 0) else 15.0
+    return {
+        "width": int(video["width"]),
+        "height": int(video["height"]),
+        "fps": fps,
+        "has_audio": any(s.get("codec_type") == "audio" for s in streams),
+    }
+
+
+class FrameBusIngest:
+    """Owns the camera connection and the shared-memory rings."""
+
+    def __init__(self, url: str, name: str = BUS_NAME,
+                 video_slots: int = VIDEO_SLOTS, audio_slots: int = AUDIO_SLOTS):
+        self.url = url
+        self.name = name
+        self.video_slots = video_slots
+        self.audio_slots = audio_slots
+        self.video: Optional[_Ring] = None
+        self.audio: Optional[_Ring] = None
+        self.video_seq = 0
+        self.audio_seq = 0
+
+    def _ensure_rings(self, info: dict) -> None:
+        shape = (info["height"], info["width"], 3)
+        if self.video is None or self.video.shape != shape:
+            if self.video is not None:
+                # Resolution changed: consumers re-attach when they notice.
+                self.video.close()
+                self.video.shm.unlink()
+            self.video = _Ring.create(f"{self.name}_video", self.video_slots, shape, np.uint8,
+                                      {_H_DIM0: shape[0], _H_DIM1: shape[1], _H_DIM2: shape[2],
+                                       _H_FPS_MILLI: int(info["fps"] * 1000)})
+            self.video_seq = 0
+        self.video.header[_H_FPS_MILLI] = int(info["fps"] * 1000)
+
+        if self.audio is None:
+            self.audio = _Ring.create(f"{self.name}_audio", self.audio_slots,
+                                      (AUDIO_CHUNK,), np.int16,
+                                      {_H_DIM0: AUDIO_CHUNK, _H_DIM1: AUDIO_RATE})
+
+    def _spawn(self, info: dict) -> tuple[subprocess.Popen, Optional[int]]:
+        """One ffmpeg process: raw BGR video on stdout, PCM on an extra pipe."""
+        cmd = [
+            "ffmpeg", "-loglevel", "error", "-rtsp_transport", "tcp",
+            "-fflags", "nobuffer", "-flags", "low_delay", "-i", self.url,
+            "-map", "0:v:0", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1",
+        ]
+        audio_r, audio_w = None, None
+        if info["has_audio"]:
+            audio_r, audio_w = os.pipe()
+            cmd += ["-map", "0:a:0", "-vn", "-acodec", "pcm_s16le",
+                    "-ar", str(AUDIO_RATE), "-ac", "1", "-f", "s16le", f"pipe:{audio_w}"]
+
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                pass_fds=(audio_w,) if audio_w is not None else ())
+        if audio_w is not None:
+            os.close(audio_w)
+        return proc, audio_r
+
+    def _pump_audio(self, fd: int) -> None:
+        chunk_bytes = AUDIO_CHUNK * 2
+        with os.fdopen(fd, "rb", buffering=0) as pipe:
+            buf = bytearray()
+            while True:
+                data = pipe.read(chunk_bytes - len(buf))
+                if not data:
+                    return
+                buf += data
+                if len(buf) == chunk_bytes:
+                    self.audio.publish(self.audio_seq, np.frombuffer(buf, dtype=np.int16))
+                    self.audio_seq += 1
+                    buf.clear()
+
+    def run(self) -> None:
+        while True:
+            proc = None
+            try:
+                info = probe_stream(self.url)
+                self._ensure_rings(info)
+                log.info("Bus '%s' ingesting %dx%d @ %.1f fps%s", self.name,
+                         info["width"], info["height"], info["fps"],
+                         " + audio" if info["has_audio"] else "")
+
+                proc, audio_fd = self._spawn(info)
+                if audio_fd is not None:
+                    threading.Thread(target=self._pump_audio, args=(audio_fd,),
+                                     daemon=True).start()
+
+                frame_bytes = info["width"] * info["height"] * 3
+                shape = self.video.shape
+                while True:
+                    raw = proc.stdout.read(frame_bytes)
+                    if len(raw) < frame_bytes:
+                        break
+                    self.video.publish(self.video_seq,
+                                       np.frombuffer(raw, dtype=np.uint8).reshape(shape))
+                    self.video_seq += 1
+                log.warning("Stream ended, reconnecting in %ds", RECONNECT_DELAY)
+
+            except KeyboardInterrupt:
+                break
+            except Exception as exc:
+                log.error("Ingest error: %s", exc)
+            finally:
+                if proc:
+                    proc.kill()
+                    proc.wait()
+            time.sleep(RECONNECT_DELAY)
+
+    def close(self) -> None:
+        for ring in (self.video, self.audio):
+            if ring is not None:
+                ring.close()
+                ring.shm.unlink()
+
+
+# ---------------------------------------------------------------------------
+# CONSUMERS
+# ---------------------------------------------------------------------------
+class _RingReader:
+    """Tracks one consumer's position in a ring and skips it forward when it lags."""
+
+    def __init__(self, name: str, dtype, shape_from_header):
+        self.name = name
+        self.dtype = dtype
+        self.shape_from_header = shape_from_header
+        self.ring: Optional[_Ring] = None
+        self.next_seq: Optional[int] = None
+        self.dropped = 0
+        self._last_check = time.monotonic()
+        self._attach()
+
+    def _attach(self) -> None:
+        shm = _attach(self.name)
+        header = np.ndarray((_H_SIZE,), dtype=np.int64, buffer=shm.buf)
+        generation = int(header[_H_GEN])
+        slots, shape = int(header[_H_SLOTS]), self.shape_from_header(header)
+        del header
+        if not generation:
+            # Ingest is still filling in the header; the caller retries
+            shm.close()
+            raise FileNotFoundError(f"{self.name} is not ready yet")
+        self.generation = generation
+        self.ring = _Ring(shm, slots, shape, self.dtype)
+
+    def _reattach_if_replaced(self) -> None:
+        """
+        The ingest recreates its rings when it restarts or the camera
+        resolution changes; the old segment is unlinked but stays mapped
+        here, so compare creation ids and follow the new one.
+        """
+        self._last_check = time.monotonic()
+        try:
+            probe = _attach(self.name)
+        except FileNotFoundError:
+            return
+        header = np.ndarray((_H_SIZE,), dtype=np.int64, buffer=probe.buf)
+        generation = int(header[_H_GEN])
+        replaced = generation and generation != self.generation
+        del header
+        probe.close()
+        if replaced:
+            log.info("%s: ingest restarted, re-attaching", self.name)
+            old = self.ring
+            try:
+                self._attach()
+            except FileNotFoundError:
+                return  # Replaced again mid-attach; next check picks it up
+            old.close()
+            self.next_seq = None
+
+    def next(self, timeout: float) -> Optional[np.ndarray]:
+        """Block until the next item is published; returns a read-only view."""
+        deadline = time.monotonic() + timeout
+        while True:
+            latest = self.ring.latest()
+            if latest >= 0:
+                if self.next_seq is None or self.next_seq > latest + 1:
+                    # First read (or the ingest restarted): start at the newest item.
+                    self.next_seq = latest
+                # Keep one slot of headroom: the writer may already be filling latest + 1.
+                if latest - self.next_seq >= self.ring.slots - 1:
+                    skipped = latest - self.next_seq
+                    self.dropped += skipped
+                    log.debug("%s: consumer lagging, skipped %d items", self.name, skipped)
+                    self.next_seq = latest
+                if self.next_seq <= latest:
+                    item = self.ring.get(self.next_seq)
+                    self.next_seq += 1
+                    if item is not None:
+                        item.flags.writeable = False
+                        return item
+                    continue
+            now = time.monotonic()
+            if now - self._last_check > 1.0:
+                # Nothing new for a while: maybe the ingest was restarted
+                self._reattach_if_replaced()
+                continue
+            if now > deadline:
+                return None
+            time.sleep(0.002)
+
+    def close(self) -> None:
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+class BusCapture:
+    """
+    Drop-in stand-in for the parts of cv2.VideoCapture the tools use.
+
+    Frames are read-only views into shared memory and stay valid until the
+    ingest wraps around the ring (VIDEO_SLOTS - 1 frames later). Copy before
+    drawing on them or holding on to them.
+    """
+
+    def __init__(self, name: str = BUS_NAME, timeout: float = READ_TIMEOUT):
+        self.timeout = timeout
+        self._reader = _RingReader(f"{name}_video", np.uint8,
+                                   lambda h: (int(h[_H_DIM0]), int(h[_H_DIM1]), int(h[_H_DIM2])))
+
+    @property
+    def dropped(self) -> int:
+        return self._reader.dropped
+
+    def isOpened(self) -> bool:
+        return self._reader.ring is not None
+
+    def read(self):
+        frame = self._reader.next(self.timeout)
+        return (frame is not None), frame
+
+    def get(self, prop: int) -> float:
+        header = self._reader.ring.header
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(header[_H_DIM1])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(header[_H_DIM0])
+        if prop == cv2.CAP_PROP_FPS:
+            return header[_H_FPS_MILLI] / 1000.0
+        return 0.0
+
+    def set(self, prop: int, value: float) -> bool:
+        return False
+
+    def release(self) -> None:
+        self._reader.close()
+
+
+class AudioBusReader:
+    """
+    Reads PCM (s16le, 16 kHz, mono) from the bus.
+
+    Mirrors the subset of subprocess.Popen the audio monitor uses
+    (`.stdout.read(n)` and `.terminate()`), so it can replace the
+    per-tool ffmpeg process without touching the detection loop.
+    """
+
+    def __init__(self, name: str = BUS_NAME, timeout: float = READ_TIMEOUT):
+        self.timeout = timeout
+        self._reader = _RingReader(f"{name}_audio", np.int16,
+                                   lambda h: (int(h[_H_DIM0]),))
+        self._pending = bytearray()
+
+    @property
+    def stdout(self) -> "AudioBusReader":
+        return self
+
+    @property
+    def dropped(self) -> int:
+        return self._reader.dropped
+
+    def read(self, n: int) -> bytes:
+        while len(self._pending) < n:
+            chunk = self._reader.next(self.timeout)
+            if chunk is None:
+                break
+            self._pending += chunk.tobytes()
+        out = bytes(self._pending[:n])
+        del self._pending[:n]
+        return out
+
+    def terminate(self) -> None:
+        self._reader.close()
+
+
+def open_capture(url: Optional[str]):
+    """cv2.VideoCapture on the camera, or a BusCapture when FRAME_BUS is set."""
+    bus = os.getenv("FRAME_BUS")
+    if bus:
+        try:
+            return BusCapture(bus)
+        except FileNotFoundError:
+            log.warning("Frame bus '%s' not running, falling back to direct RTSP", bus)
+    return cv2.VideoCapture(url)
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    parser = argparse.ArgumentParser(description="Single-ingest frame/audio bus")
+    parser.add_argument("--url", default=RTSP_URL)
+    parser.add_argument("--name", default=BUS_NAME)
+    parser.add_argument("--video-slots", type=int, default=VIDEO_SLOTS)
+    parser.add_argument("--audio-slots", type=int, default=AUDIO_SLOTS)
+    args = parser.parse_args()
+
+    if not args.url:
+        log.error("RTSP_URL not set in .env")
+        return
+
+    ingest = FrameBusIngest(args.url, args.name, args.video_slots, args.audio_slots)
+    try:
+        ingest.run()
+    finally:
+        ingest.close()
+
+
+if __name__ == "__main__":
+    main()
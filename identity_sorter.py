@@ -17,9 +17,6 @@ CLASS_MAP = {
 
 UNDO_KEYS = [63234, 2, 81, ord('u'), ord('U'), 2424832, 65361] 
 
-for folder in CLASS_MAP.values():
-    os.makedirs(os.path.join(OUTPUT_DIR, folder), exist_ok=True)
-
 def resize_for_display(img, max_size):
     """Scales the image proportionally so its longest side matches max_size."""
     h, w = img.shape[:2]
@@ -39,6 +36,9 @@ def sort_images():
         print("No images found in dataset_raw to sort.")
         return
 
+    for folder in CLASS_MAP.values():
+        os.makedirs(os.path.join(OUTPUT_DIR, folder), exist_ok=True)
+
     cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_AUTOSIZE)
     cv2.startWindowThread()
 
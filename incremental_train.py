@@ -0,0 +1,212 @@
+"""
+incremental_train.py — Fine-tune the identity classifier on new samples
+=======================================================================
+
+Instead of a full 50-epoch retrain over training_data/, fine-tune the latest
+cat_identity_vN best.pt on:
+  * every sample added since that model was trained, plus
+  * a fixed-size, class-stratified replay buffer drawn from the old data,
+and early-stop on a held-out validation split. The held-out split is chosen
+by content hash, so it is the same images for every version and the old and
+new model are compared on identical data (comparison.json in the run dir).
+
+Usage: python incremental_train.py [--base runs/classify/cat_identity_v4/weights/best.pt]
+"""
+
+import argparse
+import json
+import random
+import re
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from training_cache import TrainingCache
+
+# ---------------------------------------------------------------------------
+# CONFIGURATION
+# ---------------------------------------------------------------------------
+DATA_DIR        = Path("training_data")
+RUNS_DIR        = Path("runs/classify")
+WORK_DIR        = Path("incremental_data")     # Symlinked train/val split per run
+RUN_PREFIX      = "cat_identity_v"
+MANIFEST_NAME   = "train_manifest.json"        # Content hashes a run was trained on
+REPLAY_SIZE     = 800                          # Old samples mixed into each fine-tune
+VAL_FRACTION    = 10                           # 1 in N images (by hash) is held out
+EPOCHS          = 15
+PATIENCE        = 3                            # Early stop after N epochs without gain
+LR0             = 0.001                        # Lower than a full train; we're fine-tuning
+IMGSZ           = 320
+DEVICE          = "mps"
+SEED            = 0
+# ---------------------------------------------------------------------------
+
+
+def latest_run(runs_dir: Path = RUNS_DIR) -> tuple[int, Path]:
+    """Highest cat_identity_vN run that has a best.pt."""
+    found = []
+    for d in runs_dir.glob(f"{RUN_PREFIX}*"):
+        m = re.fullmatch(rf"{RUN_PREFIX}(\d+)", d.name)
+        if m and (d / "weights" / "best.pt").exists():
+            found.append((int(m.group(1)), d))
+    if not found:
+        raise FileNotFoundError(f"No {RUN_PREFIX}N/weights/best.pt under {runs_dir}")
+    return max(found)
+
+
+def is_held_out(digest: str) -> bool:
+    return int(digest[:8], 16) % VAL_FRACTION == 0
+
+
+def write_manifest(run_dir: Path, cache: TrainingCache) -> None:
+    """
+    Record which images a run could train on (everything but the held-out
+    split), so the next incremental run knows what's new and evaluation
+    knows which images the checkpoint has seen.
+    """
+    hashes = sorted({f["hash"] for f in cache.index["files"].values()
+                     if not is_held_out(f["hash"])})
+    (Path(run_dir) / MANIFEST_NAME).write_text(json.dumps(hashes))
+
+
+def held_out_split(cache: TrainingCache) -> tuple[list, list]:
+    """Returns (train, val) lists of (relpath, label) for a full training run."""
+    train, val = [], []
+    for rel, f in sorted(cache.index["files"].items()):
+        (val if is_held_out(f["hash"]) else train).append((rel, f["label"]))
+    return train, val
+
+
+def split_samples(cache: TrainingCache, base_run: Path, base_weights: Path):
+    """
+    Returns (new, old, val) lists of (relpath, label). Without a manifest the
+    base run predates the held-out split and has trained on val images too.
+    """
+    manifest = base_run / MANIFEST_NAME
+    if manifest.exists():
+        seen = set(json.loads(manifest.read_text()))
+        is_new = lambda f: f["hash"] not in seen
+    else:
+        # Runs from before manifests existed: anything newer than the weights is new.
+        cutoff = base_weights.stat().st_mtime_ns
+        is_new = lambda f: f["mtime_ns"] > cutoff
+
+    new, old, val = [], [], []
+    for rel, f in sorted(cache.index["files"].items()):
+        sample = (rel, f["label"])
+        if is_held_out(f["hash"]):
+            val.append(sample)
+        elif is_new(f):
+            new.append(sample)
+        else:
+            old.append(sample)
+    return new, old, val
+
+
+def replay_buffer(old: list, size: int, seed: int = SEED) -> list:
+    """Class-stratified sample of old data so no identity is forgotten."""
+    rng = random.Random(seed)
+    by_label: dict[str, list] = {}
+    for sample in old:
+        by_label.setdefault(sample[1], []).append(sample)
+    per_class = max(1, size // max(1, len(by_label)))
+    picked = []
+    for samples in by_label.values():
+        picked += rng.sample(samples, min(per_class, len(samples)))
+    return picked
+
+
+def link_split(root: Path, split: str, samples: list, data_dir: Path) -> None:
+    for rel, label in samples:
+        dst = root / split / label / Path(rel).name
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if not dst.exists():
+            dst.symlink_to((data_dir / rel).resolve())
+
+
+def evaluate(weights: Path, data: Path) -> dict:
+    from ultralytics import YOLO
+
+    metrics = YOLO(str(weights)).val(data=str(data), split="val", imgsz=IMGSZ,
+                                     device=DEVICE, plots=False, verbose=False)
+    return {"weights": str(weights), "top1": float(metrics.top1), "top5": float(metrics.top5)}
+
+
+def train_incremental(base_weights: Optional[Path] = None,
+                      name: Optional[str] = None) -> Optional[Path]:
+    from ultralytics import YOLO
+    from training_cache import CachedClassificationTrainer
+
+    version, base_run = latest_run()
+    if base_weights is None:
+        base_weights = base_run / "weights" / "best.pt"
+    else:
+        base_run = Path(base_weights).parent.parent
+    name = name or f"{RUN_PREFIX}{version + 1}"
+
+    cache = TrainingCache(imgsz=IMGSZ)
+    cache.update(DATA_DIR)
+    base_contaminated = not (base_run / MANIFEST_NAME).exists()
+    new, old, val = split_samples(cache, base_run, Path(base_weights))
+    if not new:
+        print(f"No new samples since {base_run.name}; nothing to fine-tune.")
+        return None
+    replay = replay_buffer(old, REPLAY_SIZE)
+    print(f"🔁 Fine-tuning {base_weights} → {name}: "
+          f"{len(new)} new + {len(replay)} replay, {len(val)} held out")
+
+    split_dir = WORK_DIR / name
+    shutil.rmtree(split_dir, ignore_errors=True)
+    link_split(split_dir, "train", new + replay, DATA_DIR)
+    link_split(split_dir, "val", val, DATA_DIR)
+
+    model = YOLO(str(base_weights))
+    model.train(
+        data=str(split_dir),
+        trainer=CachedClassificationTrainer,
+        epochs=EPOCHS,
+        patience=PATIENCE,
+        lr0=LR0,
+        warmup_epochs=0,
+        imgsz=IMGSZ,
+        device=DEVICE,
+        batch=16,
+        name=name,
+        seed=SEED,
+        fliplr=0.5,
+        hsv_h=0.015, hsv_s=0.7, hsv_v=0.4,
+    )
+    run_dir = Path(model.trainer.save_dir)
+    write_manifest(run_dir, cache)
+
+    # Same held-out images for both models, so the numbers are comparable
+    report = {
+        "base": evaluate(Path(base_weights), split_dir),
+        "new": evaluate(run_dir / "weights" / "best.pt", split_dir),
+        "samples": {"new": len(new), "replay": len(replay), "val": len(val)},
+        # Base run has no manifest: it trained on the held-out images, so its
+        # top1 is optimistic and the delta understates the new model.
+        "base_contaminated": base_contaminated,
+    }
+    report["top1_delta"] = report["new"]["top1"] - report["base"]["top1"]
+    (run_dir / "comparison.json").write_text(json.dumps(report, indent=2))
+
+    print(f"Base top1: {report['base']['top1']:.3f}  New top1: {report['new']['top1']:.3f}  "
+          f"(Δ {report['top1_delta']:+.3f})")
+    if base_contaminated:
+        print(f"⚠️  {base_run.name} has no {MANIFEST_NAME}; it was trained on the held-out "
+              f"images, so its top1 is not a fair comparison.")
+    print(f"Your new model is saved at: {run_dir}/weights/best.pt")
+    return run_dir
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Incremental fine-tune with replay buffer")
+    parser.add_argument("--base", type=Path, default=None, help="Weights to fine-tune from")
+    parser.add_argument("--name", default=None, help="Run name (default: next cat_identity_vN)")
+    args = parser.parse_args(argv)
+    train_incremental(args.base, args.name)
+
+
+if __name__ == "__main__":
+    main()
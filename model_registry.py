@@ -0,0 +1,168 @@
+"""
+model_registry.py — Lazy, cached model loading shared by all tools
+==================================================================
+
+Tools ask for a model by path (or TF-Hub URL) when they first need it:
+
+    from model_registry import get_model
+    detector = get_model(DETECTOR_MODEL)
+
+Each model is loaded once per process, warmed up with a dummy input so the
+first real frame doesn't pay for kernel setup, and its load/warm-up time is
+recorded in `timings` (cats.py prints them). Importing this module is cheap:
+ultralytics / tensorflow are only imported when a model of that kind is
+requested.
+
+For short-lived tools, `python cats.py serve` keeps the YOLO models resident.
+With MODEL_SERVER=127.0.0.1:6001 set, get_model() returns a RemoteModel
+that forwards predictions to the server instead of loading weights locally
+(and falls back to a local load if the server isn't running). Requests are
+pickled, so both sides need the same private MODEL_SERVER_KEY; there is no
+default key.
+"""
+
+import logging
+import os
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Any
+
+from dotenv import load_dotenv
+
+# Tools import this before calling load_dotenv() themselves
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# CONFIGURATION
+# ---------------------------------------------------------------------------
+DEVICE         = os.getenv("DEVICE", "mps")
+MODEL_SERVER   = os.getenv("MODEL_SERVER", "")          # host:port of `cats.py serve`
+SERVER_AUTHKEY = os.getenv("MODEL_SERVER_KEY", "").encode()   # Shared secret, required
+# ---------------------------------------------------------------------------
+
+_models: dict[str, Any] = {}
+_load_locks: dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+timings: dict[str, dict[str, float]] = {}
+
+
+def _is_hub_url(ref: str) -> bool:
+    return ref.startswith(("https://tfhub.dev/", "https://www.kaggle.com/models/"))
+
+
+def _load(ref: str, warmup: bool):
+    import numpy as np
+
+    t0 = time.perf_counter()
+    if _is_hub_url(ref):
+        import tensorflow_hub as hub
+        model = hub.load(ref)
+        t1 = time.perf_counter()
+        if warmup:
+            model(np.zeros(16000, dtype=np.float32))
+    else:
+        from ultralytics import YOLO
+        model = YOLO(ref)
+        t1 = time.perf_counter()
+        if warmup:
+            imgsz = 320 if model.task == "classify" else 640
+            model(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), device=DEVICE, verbose=False)
+    t2 = time.perf_counter()
+    timings[ref] = {"load_ms": (t1 - t0) * 1000, "warmup_ms": (t2 - t1) * 1000}
+    log.info("Loaded %s in %.0f ms (+%.0f ms warm-up)", ref,
+             timings[ref]["load_ms"], timings[ref]["warmup_ms"])
+    return model
+
+
+def get_model(ref: str, warmup: bool = True):
+    """Load-once accessor. Thread-safe; concurrent callers wait for the same load."""
+    ref = str(ref)
+    if ref in _models:
+        return _models[ref]
+    if MODEL_SERVER and not _is_hub_url(ref) and not SERVER_AUTHKEY:
+        log.warning("MODEL_SERVER is set but MODEL_SERVER_KEY isn't; loading %s locally", ref)
+    elif MODEL_SERVER and not _is_hub_url(ref):
+        try:
+            _models[ref] = RemoteModel(ref, MODEL_SERVER)
+            return _models[ref]
+        except (OSError, AuthenticationError) as exc:
+            log.warning("Model server %s unavailable (%s); loading %s locally",
+                        MODEL_SERVER, exc, ref)
+    with _registry_lock:
+        lock = _load_locks.setdefault(ref, threading.Lock())
+    with lock:
+        if ref not in _models:
+            _models[ref] = _load(ref, warmup)
+    return _models[ref]
+
+
+# ---------------------------------------------------------------------------
+# RESIDENT MODEL SERVER
+# ---------------------------------------------------------------------------
+def _parse_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+
+class RemoteModel:
+    """
+    Stand-in for a YOLO model living in `cats.py serve`. Supports the call
+    styles the tools use: model(frame, **kw) and model.predict(source=..., **kw).
+    Results come back moved to CPU.
+    """
+
+    def __init__(self, ref: str, address: str):
+        self.ref = ref
+        self._conn = Client(_parse_address(address), authkey=SERVER_AUTHKEY)
+        self._lock = threading.Lock()
+
+    def __call__(self, source=None, **kwargs):
+        with self._lock:
+            self._conn.send((self.ref, source, kwargs))
+            ok, payload = self._conn.recv()
+        if not ok:
+            raise RuntimeError(f"Model server error for {self.ref}: {payload}")
+        return payload
+
+    def predict(self, source=None, **kwargs):
+        return self(source, **kwargs)
+
+
+def _serve_client(conn, model_locks: dict) -> None:
+    with conn:
+        while True:
+            try:
+                ref, source, kwargs = conn.recv()
+            except EOFError:
+                return
+            try:
+                model = get_model(ref)
+                with model_locks.setdefault(ref, threading.Lock()):
+                    results = model(source, **kwargs)
+                conn.send((True, [r.cpu() for r in results]))
+            except Exception as exc:
+                conn.send((False, repr(exc)))
+
+
+def serve(address: str, preload: list[str]) -> None:
+    """Keep models resident and answer RemoteModel calls until interrupted."""
+    if not SERVER_AUTHKEY:
+        # Connections exchange pickles: without a private key any process that
+        # can reach the port, even on localhost, could run code in the server.
+        raise RuntimeError("Set MODEL_SERVER_KEY in .env (same value for the tools), e.g. "
+                           "python -c 'import secrets; print(secrets.token_hex(16))'")
+    global MODEL_SERVER
+    MODEL_SERVER = ""  # The server itself must load models, not proxy them
+    for ref in preload:
+        get_model(ref)
+    model_locks: dict[str, threading.Lock] = {}
+    with Listener(_parse_address(address), authkey=SERVER_AUTHKEY) as listener:
+        log.info("Model server on %s with %d models resident", address, len(_models))
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_serve_client, args=(conn, model_locks), daemon=True).start()
@@ -0,0 +1,130 @@
+"""
+preview_server.py — Throttled MJPEG preview over HTTP
+=====================================================
+
+The detection loop calls `publish(frame, results)`, which just swaps in a
+reference and returns. A separate render thread wakes up at PREVIEW_FPS,
+annotates the latest frame via the supplied `render` callback and
+JPEG-encodes it once for all viewers. With nobody connected, publish()
+is a no-op, so a preview never slows detection down.
+
+Open http://localhost:<port>/ in a browser (or VLC) to watch. The server
+binds to loopback unless a host such as 0.0.0.0 is passed explicitly; the
+preview has no authentication, so only expose it on a network you trust.
+"""
+
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+
+import cv2
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# CONFIGURATION
+# ---------------------------------------------------------------------------
+PREVIEW_FPS      = 5
+PREVIEW_WIDTH    = 960          # Downscale before encoding; 0 keeps full size
+JPEG_QUALITY     = 70
+BOUNDARY         = "frame"
+# ---------------------------------------------------------------------------
+
+log = logging.getLogger(__name__)
+
+
+class PreviewServer:
+    def __init__(self, port: int, render: Callable[[np.ndarray, Any], None],
+                 fps: float = PREVIEW_FPS, host: str = "127.0.0.1"):
+        self.render = render
+        self.interval = 1.0 / fps
+        self.viewers = 0
+        self._lock = threading.Lock()
+        self._latest: Optional[tuple[np.ndarray, Any]] = None
+        self._last_publish = 0.0
+        self._jpeg: Optional[bytes] = None
+        self._jpeg_ready = threading.Condition()
+        self._stop = threading.Event()
+
+        server = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._stream(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        threading.Thread(target=self._render_loop, daemon=True).start()
+        log.info("Preview at http://%s:%d/ (%g fps)", host, port, fps)
+
+    def publish(self, frame: np.ndarray, results: Any) -> None:
+        """
+        Hand over the newest frame and its detection results. Only copies the
+        frame (at most PREVIEW_FPS times a second) while someone is watching,
+        so the caller is free to draw on or reuse its frame afterwards.
+        """
+        if not self.viewers:
+            return
+        now = time.monotonic()
+        if now - self._last_publish < self.interval:
+            return
+        self._last_publish = now
+        with self._lock:
+            self._latest = (frame.copy(), results)
+
+    def _render_loop(self) -> None:
+        while not self._stop.is_set():
+            time.sleep(self.interval)
+            with self._lock:
+                latest, self._latest = self._latest, None
+            if latest is None:
+                continue
+            frame, results = latest
+            try:
+                self.render(frame, results)
+                if PREVIEW_WIDTH and frame.shape[1] > PREVIEW_WIDTH:
+                    scale = PREVIEW_WIDTH / frame.shape[1]
+                    frame = cv2.resize(frame, (PREVIEW_WIDTH, int(frame.shape[0] * scale)),
+                                       interpolation=cv2.INTER_AREA)
+                ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            except Exception:
+                # Keep the thread alive; viewers get the next frame that renders
+                log.exception("Preview render failed")
+                continue
+            if ok:
+                with self._jpeg_ready:
+                    self._jpeg = buf.tobytes()
+                    self._jpeg_ready.notify_all()
+
+    def _stream(self, handler: BaseHTTPRequestHandler) -> None:
+        handler.send_response(200)
+        handler.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.end_headers()
+        with self._lock:
+            self.viewers += 1
+        try:
+            last = None
+            while not self._stop.is_set():
+                with self._jpeg_ready:
+                    self._jpeg_ready.wait_for(lambda: self._jpeg is not last, timeout=5.0)
+                    jpeg = self._jpeg
+                if jpeg is None or jpeg is last:
+                    continue
+                last = jpeg
+                handler.wfile.write(
+                    f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                    f"Content-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._lock:
+                self.viewers -= 1
+
+    def close(self) -> None:
+        self._stop.set()
+        self.httpd.shutdown()
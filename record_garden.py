@@ -2,6 +2,7 @@ import cv2
 import time
 import os
 from dotenv import load_dotenv
+from frame_bus import open_capture
 
 load_dotenv()
 
@@ -11,7 +12,7 @@ OUTPUT_FILE = "empty_garden_background.mp4"
 RECORD_SECONDS = 60  # Duration of the clip
 
 def record_background():
-    cap = cv2.VideoCapture(RTSP_URL)
+    cap = open_capture(RTSP_URL)
     
     if not cap.isOpened():
         print("❌ Error: Could not connect to the RTSP stream. Check your .env file.")
@@ -0,0 +1,276 @@
+"""
+shard_writer.py — Asynchronous, optionally sharded crop/frame writer
+====================================================================
+
+Extraction scripts hand frames/crops to an ImageWriter instead of calling
+cv2.imwrite inline. JPEG encoding runs on a thread pool (cv2 releases the
+GIL), and a single writer thread appends the results, in submission order,
+either to plain files (the current class-folder layout) or to tar shards
+(WebDataset-style: members keep their relative path, e.g. stray/crop_1.jpg).
+Each shard gets a JSON-lines .idx file with member offsets for random access;
+a missing .idx (writer killed mid-shard) is rebuilt from the tar headers.
+
+Sharding is switched on with SHARD_OUTPUT=1 in .env. Expand shards back into
+folders whenever a tool needs them (identity_sorter, training):
+
+    python shard_writer.py expand shards/training_data training_data
+    python shard_writer.py ls shards/training_data
+"""
+
+import argparse
+import io
+import json
+import os
+import queue
+import tarfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ---------------------------------------------------------------------------
+# CONFIGURATION
+# ---------------------------------------------------------------------------
+SHARD_OUTPUT     = os.getenv("SHARD_OUTPUT", "0") == "1"
+SHARD_DIR        = Path(os.getenv("SHARD_DIR", "shards"))
+SHARD_MAX_BYTES  = 512 * 1024 * 1024       # Roll over to a new shard at ~512 MB
+SHARD_MAX_FILES  = 20000
+JPEG_QUALITY     = 95
+ENCODE_WORKERS   = os.cpu_count() or 4
+MAX_PENDING      = 256                     # Frames queued before write() blocks
+# ---------------------------------------------------------------------------
+
+Payload = Union[np.ndarray, bytes, str]
+
+
+def _encode(data: Payload, quality: int) -> bytes:
+    if isinstance(data, np.ndarray):
+        ok, buf = cv2.imencode(".jpg", data, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise RuntimeError("JPEG encoding failed")
+        return buf.tobytes()
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    return data
+
+
+class _FolderSink:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def add(self, relpath: str, data: bytes) -> None:
+        path = self.root / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def close(self) -> None:
+        pass
+
+
+class _ShardSink:
+    """Appends members to <root>/shard-NNNNNN.tar, starting after any existing shards."""
+
+    def __init__(self, root: Path, max_bytes: int = SHARD_MAX_BYTES,
+                 max_files: int = SHARD_MAX_FILES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        existing = sorted(self.root.glob("shard-*.tar"))
+        self.number = int(existing[-1].stem.split("-")[1]) + 1 if existing else 0
+        self.tar: Optional[tarfile.TarFile] = None
+        self.index: list[dict] = []
+
+    @property
+    def shard_path(self) -> Path:
+        return self.root / f"shard-{self.number:06d}.tar"
+
+    def add(self, relpath: str, data: bytes) -> None:
+        if self.tar is None:
+            self.tar = tarfile.open(self.shard_path, "w", format=tarfile.GNU_FORMAT)
+            self.index = []
+        info = tarfile.TarInfo(relpath)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self.tar.addfile(info, io.BytesIO(data))
+        # addfile leaves the offset just past the 512-byte-padded data block
+        padded = -(-len(data) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        self.index.append({"name": relpath, "offset": self.tar.offset - padded,
+                           "size": len(data)})
+        if self.tar.offset >= self.max_bytes or len(self.index) >= self.max_files:
+            self._finish_shard()
+
+    def _finish_shard(self) -> None:
+        if self.tar is None:
+            return
+        self.tar.close()
+        with open(self.shard_path.with_suffix(".idx"), "w") as f:
+            for entry in self.index:
+                f.write(json.dumps(entry) + "\n")
+        self.tar = None
+        self.number += 1
+
+    def close(self) -> None:
+        self._finish_shard()
+
+
+class ImageWriter:
+    """
+    Encode on a worker pool, write in order on one background thread.
+
+    with ImageWriter("training_data") as writer:
+        writer.write("stray/crop_x.jpg", crop)       # ndarray -> JPEG
+        writer.write("labels/x.txt", "0 0.5 0.5 ...") # str/bytes stored as-is
+
+    Arrays must not be modified after write(); the encoder reads them later.
+    """
+
+    def __init__(self, output_dir: Union[str, Path], shards: bool = SHARD_OUTPUT,
+                 quality: int = JPEG_QUALITY, workers: int = ENCODE_WORKERS):
+        output_dir = Path(output_dir)
+        if shards:
+            self.location = SHARD_DIR / output_dir.as_posix().replace("/", "_")
+            self._sink = _ShardSink(self.location)
+        else:
+            self.location = output_dir
+            self._sink = _FolderSink(output_dir)
+        self.quality = quality
+        self.written = 0
+        self._pool = ThreadPoolExecutor(workers)
+        self._queue: "queue.Queue[Optional[tuple[str, Future]]]" = queue.Queue(MAX_PENDING)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def write(self, relpath: str, data: Payload) -> None:
+        if self._error:
+            raise self._error
+        self._queue.put((relpath, self._pool.submit(_encode, data, self.quality)))
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            relpath, future = item
+            if self._error:
+                continue
+            try:
+                self._sink.add(relpath, future.result())
+                self.written += 1
+            except BaseException as exc:
+                self._error = exc
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        self._pool.shutdown()
+        self._sink.close()
+        if self._error:
+            raise self._error
+
+    def __enter__(self) -> "ImageWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# READING SHARDS
+# ---------------------------------------------------------------------------
+def list_shards(root: Union[str, Path]) -> list[Path]:
+    root = Path(root)
+    return [root] if root.suffix == ".tar" else sorted(root.glob("shard-*.tar"))
+
+
+def rebuild_index(shard: Path) -> list[dict]:
+    """
+    Recover the member offsets from the tar headers, e.g. when the writer was
+    killed before the shard's .idx was written. A truncated last member is
+    dropped. The result is saved as the shard's .idx.
+    """
+    shard = Path(shard)
+    end = shard.stat().st_size
+    index = []
+    with tarfile.open(shard, "r") as tar:
+        try:
+            for member in tar:
+                if member.isfile() and member.offset_data + member.size <= end:
+                    index.append({"name": member.name, "offset": member.offset_data,
+                                  "size": member.size})
+        except tarfile.ReadError:
+            pass  # Cut off mid-header; keep what was readable
+    try:
+        with open(shard.with_suffix(".idx"), "w") as f:
+            for entry in index:
+                f.write(json.dumps(entry) + "\n")
+    except OSError:
+        pass  # Read-only shard directory; the rebuilt index still works
+    return index
+
+
+def read_index(shard: Path) -> list[dict]:
+    idx = Path(shard).with_suffix(".idx")
+    if not idx.exists():
+        return rebuild_index(shard)
+    with open(idx) as f:
+        return [json.loads(line) for line in f]
+
+
+def read_member(shard: Path, entry: dict) -> bytes:
+    """Random access to one member via its index entry, without scanning the tar."""
+    with open(shard, "rb") as f:
+        f.seek(entry["offset"])
+        return f.read(entry["size"])
+
+
+def iter_members(root: Union[str, Path]) -> Iterator[tuple[str, bytes]]:
+    for shard in list_shards(root):
+        with open(shard, "rb") as f:
+            for entry in read_index(shard):
+                f.seek(entry["offset"])
+                yield entry["name"], f.read(entry["size"])
+
+
+def expand(root: Union[str, Path], output_dir: Union[str, Path]) -> int:
+    """Write shard members back out as files (e.g. training_data/<class>/x.jpg)."""
+    sink, count = _FolderSink(Path(output_dir)), 0
+    for name, data in iter_members(root):
+        sink.add(name, data)
+        count += 1
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect or expand image shards")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_expand = sub.add_parser("expand", help="Unpack shards into a folder layout")
+    p_expand.add_argument("shards", type=Path, help="Shard directory or a single .tar")
+    p_expand.add_argument("output", type=Path)
+    p_ls = sub.add_parser("ls", help="Count members per top-level folder")
+    p_ls.add_argument("shards", type=Path)
+    args = parser.parse_args()
+
+    if args.command == "expand":
+        count = expand(args.shards, args.output)
+        print(f"✅ Expanded {count} files into {args.output}")
+    else:
+        counts: dict[str, int] = {}
+        for shard in list_shards(args.shards):
+            for entry in read_index(shard):
+                top = entry["name"].split("/")[0]
+                counts[top] = counts.get(top, 0) + 1
+        for top, n in sorted(counts.items()):
+            print(f"{top:<20} {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+stream_ingest.py — RTSP ingestion with a stall watchdog
+=======================================================
+
+WatchdogCapture wraps the camera (direct RTSP, or the frame bus when
+FRAME_BUS is set) and keeps the tools close to real time:
+
+  * a reader thread pulls frames continuously and hands consumers only the
+    newest one, so a slow detector never reads seconds-old buffered frames;
+  * it tracks inter-frame gaps and how far the stream clock lags the wall
+    clock, and drains buffered frames with grab() (no hand-off or copy to
+    consumers) when lag builds;
+  * if no new frame arrives for STALL_TIMEOUT (dropped connection, or a
+    stream that is connected but frozen) it reconnects with jittered
+    exponential backoff instead of a fixed sleep;
+  * read() just returns (False, None) during an outage while reconnection
+    runs in the background, so callers can keep clips open across short
+    drops instead of tearing everything down;
+  * clip writers take a tap() instead: a bounded queue of every frame the
+    reader delivers, so recordings keep the stream's frame rate even though
+    the detector only sees the newest frame.
+
+Time-to-recover, lag and gap statistics are available from metrics() and
+logged every METRICS_INTERVAL seconds.
+"""
+
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Optional
+
+import cv2
+
+from frame_bus import BusCapture
+
+# ---------------------------------------------------------------------------
+# CONFIGURATION
+# ---------------------------------------------------------------------------
+STALL_TIMEOUT     = 3.0        # No new frame for this long -> reconnect
+MAX_LAG           = 1.5        # Seconds behind real time before draining
+BACKOFF_BASE      = 0.5        # First reconnect delay (seconds)
+BACKOFF_MAX       = 10.0
+METRICS_INTERVAL  = 60.0       # Log a metrics line this often (0 = never)
+TAP_SECONDS       = 2.0        # Frames a clip tap buffers before dropping
+# ---------------------------------------------------------------------------
+
+log = logging.getLogger(__name__)
+
+
+def _open_source(url: str):
+    bus = os.getenv("FRAME_BUS")
+    if bus:
+        return BusCapture(bus, timeout=STALL_TIMEOUT)
+    os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", "rtsp_transport;tcp")
+    cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+    cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 5000)
+    # A frozen-but-connected stream makes read() return False after this
+    cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(STALL_TIMEOUT * 1000))
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    if not cap.isOpened():
+        cap.release()
+        raise RuntimeError(f"Cannot open stream: {url}")
+    return cap
+
+
+class FrameTap:
+    """Every frame the reader thread delivers while the tap is open, in order."""
+
+    def __init__(self, owner: "WatchdogCapture", maxsize: int):
+        self._owner = owner
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self.dropped = 0              # Consumer fell more than maxsize frames behind
+
+    def _put(self, frame) -> None:
+        try:
+            self._queue.put_nowait(frame)
+        except queue.Full:
+            self.dropped += 1
+
+    def drain(self) -> list:
+        """Frames received since the last drain (never blocks)."""
+        frames = []
+        while True:
+            try:
+                frames.append(self._queue.get_nowait())
+            except queue.Empty:
+                return frames
+
+    def close(self) -> None:
+        if self._owner._untap(self) and self.dropped:
+            log.warning("Clip tap dropped %d frames (consumer too slow)", self.dropped)
+
+
+class WatchdogCapture:
+    """cv2.VideoCapture-compatible reader that survives stalls and drops."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._cap = None
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._read_seq = 0
+        self._stop = threading.Event()
+        self._props: dict[int, float] = {}
+        self._taps: list[FrameTap] = []
+
+        # Metrics
+        self.frames = 0
+        self.dropped = 0              # Newer frame arrived before the consumer read the last one
+        self.drained = 0              # Buffered frames skipped to catch up with live
+        self.reconnects = 0
+        self.lag = 0.0
+        self.max_gap = 0.0
+        self.last_recovery: Optional[float] = None
+        self.max_recovery = 0.0
+        self._gap_sum = 0.0
+        self._last_frame_at = time.monotonic()
+        self._outage_since: Optional[float] = None
+        self._clock_origin: Optional[tuple[float, float]] = None
+        self._last_pts = None
+        self._pts_frozen_since: Optional[float] = None
+        self._connected_at = time.monotonic()
+        self._failed_reconnects = 0
+
+        # Block until the first connection so callers can query size/fps
+        self._connect()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # --- connection -------------------------------------------------------
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps several tools from hammering the camera in lockstep
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    def _connect(self) -> None:
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                cap = _open_source(self.url)
+                if self._stop.is_set():
+                    # release() ran while we were connecting
+                    cap.release()
+                    return
+                self._cap = cap
+                self._props = {p: cap.get(p) for p in (cv2.CAP_PROP_FRAME_WIDTH,
+                                                       cv2.CAP_PROP_FRAME_HEIGHT,
+                                                       cv2.CAP_PROP_FPS)}
+                self._clock_origin = None
+                self._last_pts = None
+                self._pts_frozen_since = None
+                self._connected_at = time.monotonic()
+                log.info("Stream connected — %dx%d @ %.1f fps",
+                         self._props[cv2.CAP_PROP_FRAME_WIDTH],
+                         self._props[cv2.CAP_PROP_FRAME_HEIGHT],
+                         self._props[cv2.CAP_PROP_FPS])
+                return
+            except Exception as exc:
+                delay = self._backoff(attempt)
+                log.warning("Connect failed (%s), retrying in %.1fs", exc, delay)
+                attempt += 1
+                self._stop.wait(delay)
+
+    def _reconnect(self, reason: str) -> None:
+        if self._outage_since is None:
+            self._outage_since = self._last_frame_at
+        self.reconnects += 1
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        # Back off if the previous reconnect connected but never produced a frame
+        delay = self._backoff(self._failed_reconnects) if self._failed_reconnects else 0.0
+        log.warning("Stream %s, reconnecting%s", reason,
+                    f" in {delay:.1f}s" if delay else "")
+        self._failed_reconnects += 1
+        self._stop.wait(delay)
+        self._connect()
+
+    # --- reader thread ----------------------------------------------------
+    def _stream_lag(self, now: float) -> float:
+        """Seconds the stream clock trails the wall clock since (re)connect."""
+        pts = self._cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if pts <= 0:
+            return 0.0
+        if pts == self._last_pts:
+            # Connected but the stream isn't advancing (frozen camera)
+            self._pts_frozen_since = self._pts_frozen_since or now
+        else:
+            self._pts_frozen_since = None
+        self._last_pts = pts
+        if self._clock_origin is None:
+            self._clock_origin = (now, pts)
+            return 0.0
+        wall0, pts0 = self._clock_origin
+        lag = (now - wall0) - (pts - pts0)
+        if lag < 0:
+            # Stream clock runs slightly fast; re-anchor so lag stays meaningful
+            self._clock_origin = (now, pts)
+            lag = 0.0
+        return lag
+
+    def _drain(self) -> None:
+        """
+        Skip buffered frames with grab() until it waits on the network. grab()
+        still decodes (FFmpeg needs the reference frames) but skips the
+        colour conversion and hand-off, so it runs faster than real time.
+        """
+        fps = self._props.get(cv2.CAP_PROP_FPS) or 15.0
+        while not self._stop.is_set():
+            t0 = time.monotonic()
+            if not self._cap.grab():
+                break
+            self.drained += 1
+            if time.monotonic() - t0 > 0.5 / fps:
+                break
+        # Measure lag afresh from the first live frame
+        self._clock_origin = None
+
+    def _run(self) -> None:
+        last_metrics = time.monotonic()
+        while not self._stop.is_set():
+            if self._cap is None:
+                self._reconnect("disconnected")
+                continue
+            ok, frame = self._cap.read()
+            now = time.monotonic()
+
+            if not ok or frame is None:
+                if now - max(self._last_frame_at, self._connected_at) > STALL_TIMEOUT:
+                    self._reconnect("stalled")
+                else:
+                    self._stop.wait(0.05)
+                continue
+
+            gap = now - self._last_frame_at
+            self._last_frame_at = now
+            self._failed_reconnects = 0
+            if self._outage_since is not None:
+                self.last_recovery = now - self._outage_since
+                self.max_recovery = max(self.max_recovery, self.last_recovery)
+                log.info("Stream recovered after %.1fs", self.last_recovery)
+                self._outage_since = None
+            else:
+                self.max_gap = max(self.max_gap, gap)
+                self._gap_sum += gap
+
+            if not isinstance(self._cap, BusCapture):
+                self.lag = self._stream_lag(now)
+                if self._pts_frozen_since and now - self._pts_frozen_since > STALL_TIMEOUT:
+                    self._reconnect("frozen")
+                    continue
+                if self.lag > MAX_LAG:
+                    log.info("Stream %.1fs behind, draining buffered frames", self.lag)
+                    self._drain()
+                    continue
+
+            with self._cond:
+                if self._read_seq < self._seq:
+                    self.dropped += 1
+                self._frame = frame
+                self._seq += 1
+                self.frames += 1
+                taps = list(self._taps)
+                self._cond.notify_all()
+            # Each tap gets its own copy: read() may still hand this array to
+            # the detector (and bus frames are views into a ring that wraps)
+            for tap in taps:
+                tap._put(frame.copy())
+
+            if METRICS_INTERVAL and now - last_metrics > METRICS_INTERVAL:
+                last_metrics = now
+                m = self.metrics()
+                log.info("Ingest: lag %.2fs, max gap %.2fs, %d reconnects, "
+                         "last recovery %s, %d dropped, %d drained",
+                         m["lag"], m["max_gap"], m["reconnects"],
+                         f"{m['last_recovery']:.1f}s" if m["last_recovery"] else "n/a",
+                         m["dropped"], m["drained"])
+
+    # --- consumer API -----------------------------------------------------
+    def read(self, timeout: float = STALL_TIMEOUT):
+        """Newest frame not yet returned, or (False, None) if none arrives in time."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > self._read_seq or self._stop.is_set(),
+                                       timeout=timeout):
+                return False, None
+            if self._stop.is_set():
+                return False, None
+            self._read_seq = self._seq
+            return True, self._frame
+
+    def tap(self, first=None, seconds: float = TAP_SECONDS) -> FrameTap:
+        """
+        Start queueing every new frame for a clip writer, after `first` (the
+        frame just read, if given). read() skips frames the consumer was too
+        slow for; a tap doesn't, so clips written from it play back at the
+        stream's frame rate. Frames are private copies the caller may draw
+        on. Close it when the clip ends.
+        """
+        fps = self._props.get(cv2.CAP_PROP_FPS) or 15.0
+        tap = FrameTap(self, max(1, int(seconds * fps)) + 1)
+        if first is not None:
+            tap._put(first.copy())
+        with self._cond:
+            self._taps.append(tap)
+        return tap
+
+    def _untap(self, tap: FrameTap) -> bool:
+        with self._cond:
+            if tap not in self._taps:
+                return False
+            self._taps.remove(tap)
+            return True
+
+    def isOpened(self) -> bool:
+        return not self._stop.is_set()
+
+    def get(self, prop: int) -> float:
+        return self._props.get(prop, 0.0)
+
+    def metrics(self) -> dict:
+        good = max(1, self.frames - 1)
+        return {
+            "frames": self.frames,
+            "lag": self.lag,
+            "max_gap": self.max_gap,
+            "mean_gap": self._gap_sum / good,
+            "reconnects": self.reconnects,
+            "last_recovery": self.last_recovery,
+            "max_recovery": self.max_recovery,
+            "dropped": self.dropped,
+            "drained": self.drained,
+        }
+
+    def release(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        # The reader may be inside read()/open (bounded by the capture
+        # timeouts); releasing the capture under it would crash FFmpeg.
+        self._thread.join()
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
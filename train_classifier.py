@@ -1,6 +1,14 @@
-from ultralytics import YOLO
+import shutil
+from pathlib import Path
+
+from incremental_train import WORK_DIR, held_out_split, link_split, write_manifest
+from training_cache import TrainingCache
 
 def train_cat_identity_model():
+    # torch/ultralytics load here, not at import, so `cats.py --dry-run train` stays fast
+    from ultralytics import YOLO
+    from training_cache import CachedClassificationTrainer
+
     # 1. Load the base classification model
     # 'yolov8n-cls' is the "nano" version—perfect for speed and real-time use
     #model = YOLO('yolov8n-cls.pt')
@@ -9,9 +17,24 @@ def train_cat_identity_model():
 
     outputname = 'cat_identity_v4'  # Name for the new model version
 
-    # 2. Start training
+    # 2. Decode training_data once into the memmap cache (only new/changed files)
+    cache = TrainingCache(imgsz=320)
+    stats = cache.update('training_data')
+    print(f"Training cache: {stats['decoded']} decoded, {stats['rows']} cached")
+
+    # 3. Same content-hash held-out split as incremental_train/evaluate_models,
+    #    so held-out images are never trained on by any version
+    train, val = held_out_split(cache)
+    split_dir = WORK_DIR / outputname
+    shutil.rmtree(split_dir, ignore_errors=True)
+    link_split(split_dir, 'train', train, Path('training_data'))
+    link_split(split_dir, 'val', val, Path('training_data'))
+    print(f"Split: {len(train)} train, {len(val)} held out")
+
+    # 4. Start training
     results = model.train(
-        data='training_data',    # Path to your sorted folders
+        trainer=CachedClassificationTrainer,  # Read images from training_cache/, not the JPEGs
+        data=str(split_dir),     # Symlinked train/val split of training_data
         epochs=50,               # 50 passes through the data
         imgsz=320,               # Standard size for classification
         device='mps',            # USE THE M4 GPU!
@@ -21,6 +44,9 @@ def train_cat_identity_model():
         hsv_h=0.015, hsv_s=0.7, hsv_v=0.4  # Randomly adjust hue, saturation, and brightness for augmentation       
     )
 
+    # Remember what this version saw so incremental_train.py can find the new samples
+    write_manifest(model.trainer.save_dir, cache)
+
     print("Training Complete!")
     print(f"Your new model is saved at: runs/classify/{outputname}/weights/best.pt")
 
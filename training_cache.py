@@ -0,0 +1,306 @@
+"""
+training_cache.py — Pre-decoded, memory-mapped training cache
+=============================================================
+
+Decodes every image under training_data/ once, shrinks it so the shorter
+side is IMGSZ (aspect ratio kept, no crop) and stores it padded in one uint8
+memmap next to a JSON label index that records each image's real size.
+The dataset hands Ultralytics the unpadded image, so training augmentation
+(random resized crop) still sees the whole frame and only validation applies
+the centre crop, exactly as when reading the JPEGs. Entries are keyed by
+content hash, so re-running only decodes files that were added or changed
+and frees rows of files that were removed.
+
+Build/update:  python training_cache.py
+Training:      train_classifier.py uses CachedClassificationTrainer, which
+               reads train/val images from the cache instead of the JPEGs.
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# ---------------------------------------------------------------------------
+# CONFIGURATION
+# ---------------------------------------------------------------------------
+DATA_DIR    = Path("training_data")
+CACHE_DIR   = Path("training_cache")
+IMGSZ       = 320                            # Must match imgsz in train_classifier
+MAX_ASPECT  = 2.0                            # Longer side is capped at IMGSZ * this
+IMAGE_EXTS  = (".jpg", ".jpeg", ".png")
+WORKERS     = os.cpu_count() or 4
+# ---------------------------------------------------------------------------
+
+log = logging.getLogger(__name__)
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def resize_for_training(img: np.ndarray, imgsz: int, max_side: int) -> np.ndarray:
+    """
+    Shrink so the shorter side is imgsz and the longer side fits max_side.
+    No crop and no upscaling; the Ultralytics transforms do that per epoch.
+    """
+    h, w = img.shape[:2]
+    scale = min(1.0, imgsz / min(h, w), max_side / max(h, w))
+    if scale == 1.0:
+        return img
+    nh, nw = max(1, round(h * scale)), max(1, round(w * scale))
+    return cv2.resize(img, (nw, nh), interpolation=cv2.INTER_AREA)
+
+
+class TrainingCache:
+    """
+    images_<imgsz>.u8   uint8 memmap, shape (capacity, side, side, 3), BGR,
+                        side = imgsz * MAX_ASPECT; each image top-left, zero padded
+    index_<imgsz>.json  {"version", "capacity", "rows": {hash: [row, h, w]},
+                         "files": {relpath: {"hash", "label", "size", "mtime_ns"}},
+                         "unreadable": [hash, ...]}
+    """
+
+    VERSION = 2                              # 1 stored centre crops; rebuild those
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, imgsz: int = IMGSZ):
+        self.cache_dir = Path(cache_dir)
+        self.imgsz = imgsz
+        self.side = round(imgsz * MAX_ASPECT)
+        self.images_path = self.cache_dir / f"images_{imgsz}.u8"
+        self.index_path = self.cache_dir / f"index_{imgsz}.json"
+        self.index = {"version": self.VERSION, "capacity": 0, "rows": {}, "files": {},
+                      "unreadable": []}
+        if self.index_path.exists():
+            index = json.loads(self.index_path.read_text())
+            if index.get("version") == self.VERSION:
+                self.index = index
+            else:
+                log.info("Training cache format changed, rebuilding %s", self.images_path)
+        self._images: Optional[np.memmap] = None
+        self._by_name_size: Optional[dict] = None
+
+    def __getstate__(self) -> dict:
+        # DataLoader workers are spawned on macOS; reopen the memmap there
+        # instead of pickling its contents.
+        state = self.__dict__.copy()
+        state["_images"] = None
+        return state
+
+    @property
+    def row_shape(self) -> tuple[int, int, int]:
+        return (self.side, self.side, 3)
+
+    @property
+    def images(self) -> np.memmap:
+        if self._images is None:
+            self._images = np.memmap(self.images_path, dtype=np.uint8, mode="r",
+                                     shape=(self.index["capacity"], *self.row_shape))
+        return self._images
+
+    def _grow(self, capacity: int) -> np.memmap:
+        """Extend the memmap file in place; existing rows keep their offsets."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        row_bytes = int(np.prod(self.row_shape))
+        with open(self.images_path, "ab") as f:
+            f.truncate(capacity * row_bytes)
+        self.index["capacity"] = capacity
+        self._images = None
+        return np.memmap(self.images_path, dtype=np.uint8, mode="r+",
+                         shape=(capacity, *self.row_shape))
+
+    def update(self, data_dir: Path = DATA_DIR, workers: int = WORKERS) -> dict:
+        """Sync the cache with data_dir. Returns added/removed/decoded counts."""
+        data_dir = Path(data_dir)
+        old_files = self.index["files"]
+        new_files = {}
+        to_hash = []
+        for path in sorted(data_dir.glob("*/*")):
+            if path.suffix.lower() not in IMAGE_EXTS:
+                continue
+            rel = path.relative_to(data_dir).as_posix()
+            st = path.stat()
+            old = old_files.get(rel)
+            if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                new_files[rel] = old
+            else:
+                new_files[rel] = {"hash": None, "label": path.parent.name,
+                                  "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                to_hash.append(rel)
+
+        with ThreadPoolExecutor(workers) as pool:
+            for rel, digest in zip(to_hash, pool.map(lambda r: file_hash(data_dir / r), to_hash)):
+                new_files[rel]["hash"] = digest
+
+        rows = self.index["rows"]
+        live = {f["hash"] for f in new_files.values()}
+        for h in [h for h in rows if h not in live]:
+            del rows[h]
+        # Every row no live image uses, including ones freed by earlier runs
+        free = sorted(set(range(self.index["capacity"])) - {r[0] for r in rows.values()})
+        # Files that failed to decode before are remembered by hash, not retried
+        unreadable = set(self.index.get("unreadable", [])) & live
+        missing = sorted(live - rows.keys() - unreadable)
+        first_path = {}
+        for rel, f in new_files.items():
+            first_path.setdefault(f["hash"], rel)
+
+        images, decoded = None, 0
+        if missing:
+            next_row = self.index["capacity"]
+            needed = max(0, len(missing) - len(free))
+            images = self._grow(next_row + needed)
+            free += list(range(next_row, next_row + needed))
+
+            def decode(digest: str) -> tuple[str, Optional[np.ndarray]]:
+                img = cv2.imread(str(data_dir / first_path[digest]))
+                if img is None:
+                    return digest, None
+                return digest, resize_for_training(img, self.imgsz, self.side)
+
+            with ThreadPoolExecutor(workers) as pool:
+                for digest, img in pool.map(decode, missing):
+                    if img is None:
+                        log.warning("Unreadable image skipped: %s", first_path[digest])
+                        unreadable.add(digest)
+                        continue
+                    row = free.pop(0)
+                    h, w = img.shape[:2]
+                    images[row, :h, :w] = img
+                    rows[digest] = [row, h, w]
+                    decoded += 1
+            images.flush()
+
+        self.index["unreadable"] = sorted(unreadable)
+        self.index["files"] = {rel: f for rel, f in new_files.items() if f["hash"] not in unreadable}
+        self.save()
+        self._by_name_size = None
+        return {"added": len([r for r in to_hash if r not in old_files]),
+                "removed": len(old_files.keys() - new_files.keys()),
+                "decoded": decoded,
+                "rows": len(rows)}
+
+    def save(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.index))
+        tmp.replace(self.index_path)
+
+    def labels(self) -> dict[str, list[str]]:
+        """Label index: class name -> content hashes."""
+        out: dict[str, list[str]] = {}
+        for f in self.index["files"].values():
+            out.setdefault(f["label"], []).append(f["hash"])
+        return out
+
+    def image(self, entry: list[int]) -> np.ndarray:
+        """Unpadded BGR view of a cached image, entry as stored in index["rows"]."""
+        row, h, w = entry
+        return self.images[row, :h, :w]
+
+    def lookup(self, path: Path) -> Optional[list[int]]:
+        """
+        Row entry ([row, h, w]) for an image file, or None if it isn't cached.
+
+        Ultralytics may train from a copy of training_data (e.g. the
+        auto-generated *_split folder), so match on filename + size before
+        falling back to hashing the file.
+        """
+        if self._by_name_size is None:
+            self._by_name_size = {}
+            for rel, f in self.index["files"].items():
+                self._by_name_size[(Path(rel).name, f["size"])] = f["hash"]
+        path = Path(path)
+        digest = self._by_name_size.get((path.name, path.stat().st_size))
+        if digest is None:
+            digest = file_hash(path)
+        entry = self.index["rows"].get(digest)
+        return None if entry is None or entry[0] >= self.index["capacity"] else entry
+
+
+@functools.lru_cache(maxsize=None)
+def _ultralytics_classes() -> dict[str, type]:
+    """
+    Build the Ultralytics subclasses on first use, so importing this module
+    (e.g. for `cats.py --dry-run`) doesn't pull in torch.
+    """
+    from ultralytics.data.dataset import ClassificationDataset
+    from ultralytics.models.yolo.classify import ClassificationTrainer
+
+    class CachedClassificationDataset(ClassificationDataset):
+        """ClassificationDataset that reads pre-decoded images from a TrainingCache."""
+
+        def __init__(self, *args, cache: TrainingCache, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.cache = cache
+            self.rows = [cache.lookup(s[0]) for s in self.samples]
+            hits = sum(r is not None for r in self.rows)
+            log.info("%s: %d/%d images served from cache", self.prefix, hits, len(self.rows))
+
+        def __getitem__(self, i: int) -> dict:
+            entry = self.rows[i]
+            if entry is None:
+                return super().__getitem__(i)
+            im = self.cache.image(entry)
+            im = Image.fromarray(cv2.cvtColor(im, cv2.COLOR_BGR2RGB))
+            return {"img": self.torch_transforms(im), "cls": self.samples[i][1]}
+
+    class CachedClassificationTrainer(ClassificationTrainer):
+        """Train and validate from the memmap cache; the validator reuses test_loader."""
+
+        def build_dataset(self, img_path: str, mode: str = "train", batch=None):
+            cache = TrainingCache(CACHE_DIR, self.args.imgsz)
+            return CachedClassificationDataset(root=img_path, args=self.args,
+                                               augment=mode == "train", prefix=mode, cache=cache)
+
+    classes = {"CachedClassificationDataset": CachedClassificationDataset,
+               "CachedClassificationTrainer": CachedClassificationTrainer}
+    # Make them picklable by name (spawned DataLoader workers) via __getattr__ below
+    for name, cls in classes.items():
+        cls.__module__, cls.__qualname__ = __name__, name
+    return classes
+
+
+def __getattr__(name: str):
+    # `from training_cache import CachedClassificationTrainer` builds it on demand
+    if name in ("CachedClassificationDataset", "CachedClassificationTrainer"):
+        return _ultralytics_classes()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    parser = argparse.ArgumentParser(description="Build/update the training image cache")
+    parser.add_argument("--data", type=Path, default=DATA_DIR)
+    parser.add_argument("--cache", type=Path, default=CACHE_DIR)
+    parser.add_argument("--imgsz", type=int, default=IMGSZ)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    cache = TrainingCache(args.cache, args.imgsz)
+    stats = cache.update(args.data, args.workers)
+    log.info("Cache updated — %(added)d added, %(removed)d removed, "
+             "%(decoded)d decoded, %(rows)d images cached", stats)
+    for label, hashes in sorted(cache.labels().items()):
+        log.info("  %-12s %d", label, len(hashes))
+
+
+if __name__ == "__main__":
+    main()